@@ -5,7 +5,7 @@ a = Analysis(
     ['src\\main.py'],
     pathex=[],
     binaries=[],
-    datas=[('src/map_app.html', 'src'), ('src/qwebchannel.js', 'src')],
+    datas=[('src/map_app.html', 'src'), ('src/qwebchannel.js', 'src'), ('src/vendor', 'src/vendor')],
     hiddenimports=['PyQt5', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets', 'PyQt5.QtWebEngineWidgets', 'PyQt5.QtWebChannel', 'PyQt5.QtNetwork'],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,260 @@
+import argparse
+import gzip
+import http.server
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import unicodedata
+from urllib import request as urllib_request
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+# Local stand-ins for Nominatim, OSRM, Open-Meteo and ip-api, so benchmarks
+# never touch the public services. Responses come from the sample responses
+# in benchmarks/fixtures (real ones can be captured into a directory passed
+# with --fixtures; OSRM routes are generated in OSRM's response format
+# for whatever waypoints are asked for) and are delayed by a configurable
+# latency. The servers run in a child process so their CPU time does not
+# compete with the code being measured.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from src.utils import polyline
+from src.utils.geometry import haversine
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# name -> kind; osrm_large is an OSRM that answers with very long geometries
+SERVICES = {
+    "nominatim": "nominatim",
+    "osrm": "osrm",
+    "osrm_large": "osrm",
+    "open_meteo": "open_meteo",
+    "ip_api": "ip_api",
+}
+DEFAULT_LATENCY_MS = 50
+DEFAULT_JITTER_MS = 10
+# Geometry vertices per route leg
+DEFAULT_ROUTE_POINTS = 400
+DEFAULT_LARGE_ROUTE_POINTS = 50000
+ROUTE_SPEED_MPS = 14.0
+
+
+def load_fixture(name, directory=FIXTURES):
+    with open(os.path.join(directory, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fold(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _matches(query, display_name):
+    # Roughly Nominatim: every query word starts a word of the result
+    words = _fold(display_name).replace(",", " ").split()
+    return all(any(word.startswith(token) for word in words) for token in _fold(query).split())
+
+
+def synthesize_route(template, points, points_per_leg, alternative=0):
+    """
+    One OSRM route through `points` ([lat, lon]) with `points_per_leg`
+    vertices per leg. The path wiggles around the straight line so that
+    simplification has real work to do; waypoints are hit exactly.
+    """
+    route = json.loads(json.dumps(template["routes"][0]))
+    t = np.linspace(0.0, 1.0, max(2, points_per_leg))
+    pieces, legs = [], []
+    for (lat1, lon1), (lat2, lon2) in zip(points[:-1], points[1:]):
+        wiggle = 0.002 * (1 + alternative) * np.sin(t * math.pi * (40 + 7 * alternative))
+        lat = lat1 + (lat2 - lat1) * t + wiggle
+        lon = lon1 + (lon2 - lon1) * t - wiggle
+        coords = np.column_stack((lat, lon))
+        distance = float(haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]).sum())
+        pieces.append(coords if not pieces else coords[1:])
+        legs.append(dict(route["legs"][0], distance=distance, duration=distance / ROUTE_SPEED_MPS,
+                         weight=distance / ROUTE_SPEED_MPS))
+    route["geometry"] = polyline.encode(np.concatenate(pieces))
+    route["legs"] = legs
+    route["distance"] = sum(leg["distance"] for leg in legs)
+    route["duration"] = route["weight"] = sum(leg["duration"] for leg in legs)
+    return route
+
+
+class FakeServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 overflows when a burst of connections
+    # arrives at once; dropped SYNs are retried after ~1 s and skew latencies
+    request_queue_size = 1024
+
+    def __init__(self, kind, latency_ms, jitter_ms, route_points, fixtures):
+        super().__init__(("127.0.0.1", 0), FakeHandler)
+        self.kind = kind
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.route_points = route_points
+        self.fixtures = {name: load_fixture(name, fixtures) for name in
+                         ("nominatim_search", "nominatim_reverse", "osrm_route",
+                          "open_meteo_forecast", "ip_api")}
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def respond(self, path, query):
+        """
+        (status, body) for a request, by service kind.
+        """
+        if path == "/__stats":
+            return 200, {"requests": self.requests}
+        fixtures = self.fixtures
+        if self.kind == "nominatim" and path == "/search":
+            results = fixtures["nominatim_search"]
+            matching = [r for r in results if _matches(query.get("q", ""), r["display_name"])]
+            return 200, (matching or results)[:int(query.get("limit", 10))]
+        if self.kind == "nominatim" and path == "/reverse":
+            return 200, dict(fixtures["nominatim_reverse"], lat=query.get("lat"), lon=query.get("lon"))
+        if self.kind == "ip_api" and path == "/json":
+            return 200, fixtures["ip_api"]
+        if self.kind == "open_meteo" and path == "/v1/forecast":
+            return 200, dict(fixtures["open_meteo_forecast"], latitude=float(query["latitude"]),
+                             longitude=float(query["longitude"]))
+        if self.kind == "osrm" and path.startswith("/route/v1/"):
+            points = [tuple(map(float, p.split(",")))[::-1] for p in path.rsplit("/", 1)[-1].split(";")]
+            template = fixtures["osrm_route"]
+            count = 2 if query.get("alternatives") == "true" and len(points) == 2 else 1
+            routes = [synthesize_route(template, points, self.route_points, i) for i in range(count)]
+            waypoints = [dict(template["waypoints"][0], location=[lon, lat]) for lat, lon in points]
+            return 200, dict(template, routes=routes, waypoints=waypoints)
+        return 404, {"error": f"{self.kind}: no fixture for {path}"}
+
+
+class FakeHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, like the real services
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes; without this, Nagle's
+        # algorithm and delayed ACKs add ~40 ms to every response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        status, body = server.respond(parts.path, query)
+        if parts.path != "/__stats":
+            with server.lock:
+                server.requests += 1
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(options, ports, stop):
+    servers = {}
+    for name, kind in SERVICES.items():
+        route_points = options["large_route_points"] if name == "osrm_large" else options["route_points"]
+        servers[name] = FakeServer(kind, options["latency_ms"], options["jitter_ms"],
+                                   route_points, options["fixtures"])
+        threading.Thread(target=servers[name].serve_forever, daemon=True).start()
+    ports.put({name: server.server_port for name, server in servers.items()})
+    stop.wait()
+    for server in servers.values():
+        server.shutdown()
+
+
+class FakeServices:
+    """
+    Starts every fake service on 127.0.0.1 in a child process:
+
+        with FakeServices(latency_ms=50) as fakes:
+            get_backends().configure(fakes.backends())
+
+    127.0.0.1 is not in rate_limit.HOST_LIMITS, so requests to the fakes
+    are not rate limited.
+    """
+
+    def __init__(self, latency_ms=DEFAULT_LATENCY_MS, jitter_ms=DEFAULT_JITTER_MS,
+                 route_points=DEFAULT_ROUTE_POINTS, large_route_points=DEFAULT_LARGE_ROUTE_POINTS,
+                 fixtures=FIXTURES):
+        self.options = {"latency_ms": latency_ms, "jitter_ms": jitter_ms,
+                        "route_points": route_points, "large_route_points": large_route_points,
+                        "fixtures": fixtures}
+        self.process = None
+        self.urls = {}
+
+    def start(self):
+        ports = multiprocessing.Queue()
+        self.stop_event = multiprocessing.Event()
+        self.process = multiprocessing.Process(target=_serve, args=(self.options, ports, self.stop_event),
+                                               daemon=True)
+        self.process.start()
+        self.urls = {name: f"http://127.0.0.1:{port}" for name, port in ports.get(timeout=30).items()}
+        return self
+
+    def stop(self):
+        if self.process is not None:
+            self.stop_event.set()
+            self.process.join(timeout=5)
+            self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def backends(self):
+        """
+        {service: [url]} for BackendRegistry.configure.
+        """
+        return {name: [url] for name, url in self.urls.items() if name != "osrm_large"}
+
+    def request_counts(self):
+        counts = {}
+        for name, url in self.urls.items():
+            with urllib_request.urlopen(url + "/__stats", timeout=5) as response:
+                counts[name] = json.loads(response.read())["requests"]
+        return counts
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the fake backends until interrupted")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_JITTER_MS)
+    parser.add_argument("--route-points", type=int, default=DEFAULT_ROUTE_POINTS)
+    parser.add_argument("--fixtures", default=FIXTURES, help="directory of response fixtures")
+    args = parser.parse_args()
+
+    with FakeServices(args.latency_ms, args.jitter_ms, args.route_points, fixtures=args.fixtures) as fakes:
+        # Ready to paste in front of `python src/main.py` or `python -m src.cli`
+        for name, urls in fakes.backends().items():
+            print(f"CHEAPMAPS_{name.upper()}_URLS={urls[0]}", flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
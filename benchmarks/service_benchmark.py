@@ -0,0 +1,320 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Throughput and latency of the service layer (geocoding, routing, weather,
+# autocomplete) against the local fakes in fake_services.py, so results are
+# reproducible and no public service is called. Prints one JSON document;
+# pass --baseline to compare with an earlier run.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_services import (FakeServices, DEFAULT_LATENCY_MS, DEFAULT_JITTER_MS,
+                           DEFAULT_ROUTE_POINTS, DEFAULT_LARGE_ROUTE_POINTS, FIXTURES)
+
+SCENARIOS = ("search_cold", "search_warm", "search_async", "route", "route_async",
+             "route_large", "route_parse_large", "route_multistop", "route_edit", "weather_cold",
+             "weather_warm", "weather_async", "autocomplete")
+
+# Typed into the autocomplete pipeline one keystroke at a time; some match
+# the sample Nominatim results, some do not
+TYPED_QUERIES = ("Piața Unirii", "Palatul Parlamentului", "Gara de Nord", "Parcul Herăstrău",
+                 "Bucuresti", "Calea Victoriei", "Strada Lipscani", "Piata Romana")
+MULTISTOP_STOPS = 120
+# Metrics compared against a baseline: (key, True if higher is better)
+COMPARED = (("p50_ms", False), ("p95_ms", False), ("throughput_rps", True))
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def summarize(latencies, wall, errors=0, **extra):
+    samples = sorted(latencies)
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(len(samples) / wall, 2) if wall > 0 else None,
+    }
+    if samples:
+        summary.update({
+            "mean_ms": round(1000 * sum(samples) / len(samples), 3),
+            "p50_ms": round(1000 * percentile(samples, 0.50), 3),
+            "p90_ms": round(1000 * percentile(samples, 0.90), 3),
+            "p95_ms": round(1000 * percentile(samples, 0.95), 3),
+            "p99_ms": round(1000 * percentile(samples, 0.99), 3),
+            "max_ms": round(1000 * samples[-1], 3),
+        })
+    summary.update(extra)
+    return summary
+
+
+def run_threads(fn, items, concurrency):
+    """
+    Calls fn(item) for every item from `concurrency` threads. A None result
+    counts as an error (the services return None when a request failed).
+    """
+    def timed(item):
+        start = time.perf_counter()
+        result = fn(item)
+        return time.perf_counter() - start, result is None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, items))
+    wall = time.perf_counter() - start
+    return summarize([r[0] for r in results], wall, errors=sum(r[1] for r in results))
+
+
+def run_async(make_client, method, items):
+    async def main():
+        async with make_client() as client:
+            call = getattr(client, method)
+
+            async def timed(item):
+                start = time.perf_counter()
+                result = await call(*item)
+                return time.perf_counter() - start, result is None
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*(timed(item) for item in items))
+            return results, time.perf_counter() - start
+
+    results, wall = asyncio.run(main())
+    return summarize([r[0] for r in results], wall, errors=sum(r[1] for r in results))
+
+
+def route_pairs(count, base=(44.40, 26.00), step=0.0013):
+    # Distinct pairs so each one misses the route cache
+    return [[(base[0] + i * step, base[1]), (base[0] + 1.2, base[1] + i * step - 0.5)]
+            for i in range(count)]
+
+
+def typing_session(geocoder, query, limit):
+    """
+    What LocationCompleter does per keystroke, minus Qt and the debounce:
+    answer from the local index and cached result sets, and go to the
+    network only when that answer is incomplete. Returns a list of
+    (latency_s, went_remote) per keystroke.
+    """
+    from src.utils.autocomplete import MIN_QUERY_LENGTH, suggest_from_cache
+    from src.utils.geocoder import merge_suggestions
+
+    keystrokes = []
+    for end in range(MIN_QUERY_LENGTH, len(query) + 1):
+        text = query[:end]
+        start = time.perf_counter()
+        local = geocoder.local_suggest(text, limit)
+        cached, complete = suggest_from_cache(geocoder.cache, text, limit)
+        merge_suggestions(local, cached, limit)
+        remote = not (complete or len(local) >= limit)
+        if remote:
+            geocoder.suggest(text, limit)
+        keystrokes.append((time.perf_counter() - start, remote))
+    return keystrokes
+
+
+def run_benchmarks(fakes, args):
+    from src.utils.async_client import AsyncClient
+    from src.utils.backends import Service
+    from src.utils.geocoder import Geocoder, parse_routes
+    from src.utils.weather_service import WeatherService
+
+    geocoder = Geocoder()
+    weather = WeatherService()
+    n, concurrency = args.requests, args.concurrency
+    only = set(args.only or SCENARIOS)
+    results = {}
+
+    def scenario(name):
+        selected = name in only
+        if selected:
+            log(f"{name}...")
+        return selected
+
+    def make_client():
+        return AsyncClient(geocoder, weather, max_concurrency=args.async_concurrency)
+
+    queries = [f"Benchmark Street {i}, Bucharest" for i in range(n)]
+    if scenario("search_cold"):
+        results["search_cold"] = run_threads(geocoder.search, queries, concurrency)
+    if scenario("search_warm"):
+        # Same queries again: answered from the geocoding cache
+        if "search_cold" not in only:
+            run_threads(geocoder.search, queries, concurrency)
+        results["search_warm"] = run_threads(geocoder.search, queries, concurrency)
+    if scenario("search_async"):
+        items = [(f"Async Street {i}, Bucharest",) for i in range(n)]
+        results["search_async"] = run_async(make_client, "search", items)
+
+    if scenario("route"):
+        results["route"] = run_threads(geocoder.get_route, route_pairs(n), concurrency)
+    if scenario("route_async"):
+        items = [(pair,) for pair in route_pairs(n, base=(44.60, 26.00))]
+        results["route_async"] = run_async(make_client, "get_route", items)
+    if scenario("route_large"):
+        large = Geocoder()
+        large.osrm = Service("osrm", [fakes.urls["osrm_large"]])
+        pairs = route_pairs(args.large_requests, base=(44.80, 26.00))
+        results["route_large"] = run_threads(large.get_route, pairs, 1)
+        results["route_large"]["route_points"] = args.large_route_points
+    if scenario("route_parse_large"):
+        # Decoding and LOD building of a large response without the network
+        large = Geocoder()
+        large.osrm = Service("osrm", [fakes.urls["osrm_large"]])
+        path, params = large._route_request(route_pairs(1, base=(45.0, 26.0))[0], "polyline6", True)
+        data = large.osrm.get(path, params=params).json()
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.large_requests):
+            t = time.perf_counter()
+            for route in parse_routes(data, "polyline6"):
+                large._route_entry(route["coordinates"], route["distance"], route["duration"],
+                                   route["summary"])
+            latencies.append(time.perf_counter() - t)
+        results["route_parse_large"] = summarize(latencies, time.perf_counter() - start,
+                                                 route_points=args.large_route_points)
+    if scenario("route_multistop"):
+        stops = [[[45.2 + run * 0.01 + i * 0.002, 26.0 + (i % 10) * 0.01] for i in range(MULTISTOP_STOPS)]
+                 for run in range(args.multistop_requests)]
+        results["route_multistop"] = run_threads(geocoder.get_route, stops, 1)
+        results["route_multistop"]["stops"] = MULTISTOP_STOPS
+    if scenario("route_edit"):
+        # Deleting the first or last stop leaves only cached legs, so the
+        # edited routes must be assembled without any request
+        stops = [[[45.8 + run * 0.01 + i * 0.003, 26.2 + i * 0.004] for i in range(4)]
+                 for run in range(args.multistop_requests)]
+        run_threads(geocoder.get_route, stops, 1)
+        before = fakes.request_counts()["osrm"]
+        edited = [s[1:] for s in stops] + [s[:-1] for s in stops]
+        results["route_edit"] = run_threads(geocoder.get_route, edited, 1)
+        results["route_edit"]["osrm_requests"] = fakes.request_counts()["osrm"] - before
+        stops = [[[lat + 0.5, lon] for lat, lon in s] for s in stops]
+        run_async(make_client, "get_route", [(s,) for s in stops])
+        before = fakes.request_counts()["osrm"]
+        edited = [(s[1:],) for s in stops] + [(s[:-1],) for s in stops]
+        results["route_edit"]["async_errors"] = run_async(make_client, "get_route", edited)["errors"]
+        results["route_edit"]["osrm_requests"] += fakes.request_counts()["osrm"] - before
+
+    # One point per ~5 km weather cell, so cold requests never share a cell
+    cells = [(43.0 + (i // 40) * 0.1, 21.0 + (i % 40) * 0.1) for i in range(n)]
+    if scenario("weather_cold"):
+        results["weather_cold"] = run_threads(lambda p: weather.get_current_weather(*p), cells, concurrency)
+    if scenario("weather_warm"):
+        if "weather_cold" not in only:
+            run_threads(lambda p: weather.get_current_weather(*p), cells, concurrency)
+        results["weather_warm"] = run_threads(lambda p: weather.get_current_weather(*p), cells, concurrency)
+    if scenario("weather_async"):
+        items = [(lat + 3.0, lon) for lat, lon in cells]
+        results["weather_async"] = run_async(make_client, "get_current_weather", items)
+
+    if scenario("autocomplete"):
+        start = time.perf_counter()
+        keystrokes = [k for query in TYPED_QUERIES for k in typing_session(geocoder, query, 5)]
+        remote = sum(went_remote for _, went_remote in keystrokes)
+        results["autocomplete"] = summarize([k[0] for k in keystrokes], time.perf_counter() - start,
+                                            remote_lookups=remote,
+                                            instant_ratio=round(1 - remote / len(keystrokes), 3))
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """
+    Relative change per scenario and metric against a baseline run; returns
+    (changes, regressions) where regressions exceed `max_regression`.
+    """
+    changes, regressions = {}, []
+    for name, summary in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        changes[name] = {}
+        for key, higher_is_better in COMPARED:
+            if summary.get(key) is None or not before.get(key):
+                continue
+            change = summary[key] / before[key] - 1
+            changes[name][key] = round(change, 4)
+            worse = -change if higher_is_better else change
+            if max_regression is not None and worse > max_regression:
+                regressions.append(f"{name} {key}: {before[key]} -> {summary[key]}")
+    return changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CheapMaps service-layer benchmark (local fake backends)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads for the sync scenarios")
+    parser.add_argument("--async-concurrency", type=int, default=64,
+                        help="AsyncClient max_concurrency for the async scenarios")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS,
+                        help="added server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_JITTER_MS)
+    parser.add_argument("--route-points", type=int, default=DEFAULT_ROUTE_POINTS,
+                        help="geometry vertices per route leg")
+    parser.add_argument("--large-route-points", type=int, default=DEFAULT_LARGE_ROUTE_POINTS)
+    parser.add_argument("--large-requests", type=int, default=10)
+    parser.add_argument("--multistop-requests", type=int, default=5)
+    parser.add_argument("--fixtures", default=FIXTURES, help="directory of response fixtures")
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, help="run just these scenarios")
+    parser.add_argument("--output", help="write the JSON results here as well")
+    parser.add_argument("--baseline", help="earlier --output file to compare with")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="with --baseline, exit with status 1 if a p50/p95 or the "
+                             "throughput is this fraction worse (e.g. 0.2)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as data_dir:
+        # Fresh caches and no local place index or road graph, so every run
+        # starts from the same state
+        os.environ["CHEAPMAPS_DATA_DIR"] = data_dir
+        from src.utils.backends import get_backends
+
+        with FakeServices(args.latency_ms, args.jitter_ms, args.route_points,
+                          args.large_route_points, args.fixtures) as fakes:
+            get_backends().configure(fakes.backends())
+            results = run_benchmarks(fakes, args)
+            server_requests = fakes.request_counts()
+
+    report = {
+        "benchmark": "services",
+        "config": {key: getattr(args, key) for key in
+                   ("requests", "concurrency", "async_concurrency", "latency_ms", "jitter_ms",
+                    "route_points", "large_route_points", "large_requests", "multistop_requests")},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+        "server_requests": server_requests,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["changes"], regressions = compare(results, json.load(f), args.max_regression)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        log("Regressions:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Launches the app repeatedly and reports time from main() to "map ready"
+# (the QWebChannel connect callback in map_app.html).
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "src", "main.py")
+
+
+def run_once(results_path, timeout):
+    env = dict(os.environ,
+               CHEAPMAPS_STARTUP_BENCH=results_path,
+               CHEAPMAPS_STARTUP_BENCH_EXIT="1")
+    subprocess.run([sys.executable, MAIN], env=env, timeout=timeout,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CheapMaps startup (time-to-interactive) benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="exit with status 1 if the median exceeds this")
+    parser.add_argument("--output", help="write the JSON summary here as well")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results_path = os.path.join(tmp, "startup.jsonl")
+        for _ in range(args.runs):
+            run_once(results_path, args.timeout)
+        samples = []
+        if os.path.exists(results_path):
+            with open(results_path) as f:
+                samples = [json.loads(line) for line in f if line.strip()]
+
+    if not samples:
+        print("No run reached 'map ready'.")
+        sys.exit(1)
+
+    times = sorted(s["time_to_map_ready_ms"] for s in samples)
+    summary = {
+        "benchmark": "startup_time_to_map_ready",
+        "runs": len(times),
+        "median_ms": statistics.median(times),
+        "min_ms": times[0],
+        "max_ms": times[-1],
+        "leaflet_sources": sorted({s["leaflet_source"] for s in samples})
+    }
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.budget_ms is not None and summary["median_ms"] > args.budget_ms:
+        print(f"Startup regression: median {summary['median_ms']:.0f} ms > budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
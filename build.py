@@ -1,5 +1,8 @@
 import PyInstaller.__main__
 import os
+import sys
+
+import vendor_assets
 
 # Define paths
 # Note: Use separators that work on Windows; usually paths are fine but let's be safe.
@@ -9,6 +12,16 @@ import os
 
 print("Starting Build Process...")
 
+# The bundle must carry Leaflet; otherwise the packaged app silently loads it from unpkg
+if vendor_assets.missing_assets():
+    try:
+        vendor_assets.main()
+    except Exception as e:
+        print(f"Vendoring failed: {e}")
+missing = vendor_assets.missing_assets()
+if missing:
+    sys.exit(f"Build aborted: Leaflet assets missing or invalid in src/vendor/leaflet: {', '.join(missing)}")
+
 PyInstaller.__main__.run([
     'src/main.py',
     '--name=CheapMaps',
@@ -26,6 +39,8 @@ PyInstaller.__main__.run([
     '--add-data=src/map_app.html;src',
     # Add qwebchannel.js to src/ folder in bundle
     '--add-data=src/qwebchannel.js;src',
+    # Bundled Leaflet (fetched by vendor_assets.py) so the map works offline
+    '--add-data=src/vendor;src/vendor',
     # We might need to ensure src/ui and src/utils are dragged in if imports fail, 
     # but usually PyInstaller finds imports.
     # However, sometimes keeping the structure is needed if we do dynamic loading.
@@ -0,0 +1,217 @@
+import time
+STARTED_AT = time.perf_counter()
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+
+# Add project root to python path to handle imports correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Headless entry point: nothing here (or in the src.utils modules it loads)
+# may import PyQt5, and each command only imports the services it uses.
+COMMANDS = ('geocode', 'reverse', 'route', 'matrix', 'weather')
+
+
+def _quiet():
+    # The services report errors with print(); keep stdout clean for JSON
+    return contextlib.redirect_stdout(sys.stderr)
+
+
+def _emit(data):
+    print(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def _parse_coordinate(text):
+    parts = text.split(',')
+    if len(parts) != 2:
+        return None
+    try:
+        lat, lon = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return lat, lon
+    return None
+
+
+def _coordinate(value):
+    point = _parse_coordinate(value)
+    if point is None:
+        raise argparse.ArgumentTypeError(f"expected lat,lon, got {value!r}")
+    return point
+
+
+def _resolve_points(geocoder, values):
+    """
+    (lat, lon) for each argument: "lat,lon" is used as is, anything else
+    (including "My Location") is geocoded. Returns None if one fails.
+    """
+    points = []
+    for value in values:
+        point = _parse_coordinate(value)
+        if point is None:
+            with _quiet():
+                result = geocoder.resolve(value)
+            if not result:
+                print(f"Could not find {value!r}", file=sys.stderr)
+                return None
+            point = (result['lat'], result['lon'])
+        points.append(point)
+    return points
+
+
+def _finite(values):
+    return [[None if not math.isfinite(v) else float(v) for v in row] for row in values.tolist()]
+
+
+def cmd_geocode(args):
+    from src.utils.geocoder import Geocoder
+    geocoder = Geocoder(offline=args.offline)
+    with _quiet():
+        result = geocoder.resolve(args.query)
+    _emit(result)
+    return 0 if result else 1
+
+
+def cmd_reverse(args):
+    from src.utils.geocoder import Geocoder
+    lat, lon = args.point
+    with _quiet():
+        name = Geocoder().reverse(lat, lon)
+    _emit({'lat': lat, 'lon': lon, 'display_name': name})
+    return 0 if name else 1
+
+
+def cmd_route(args):
+    from src.utils.geocoder import Geocoder
+    from src.utils import polyline
+    geocoder = Geocoder(offline=args.offline)
+    geocoder.profile = args.profile
+    points = _resolve_points(geocoder, args.points)
+    if points is None:
+        _emit(None)
+        return 1
+    with _quiet():
+        routes = geocoder.get_route(points)
+    if not routes:
+        _emit([])
+        return 1
+    if not args.alternatives:
+        routes = routes[:1]
+    output = []
+    for route in routes:
+        entry = {
+            'summary': route['summary'],
+            'distance': route['distance'],
+            'duration': route['duration'],
+            'points': len(route['coordinates'])
+        }
+        if args.geometry:
+            entry['polyline6'] = polyline.encode(route['coordinates'])
+        output.append(entry)
+    _emit(output)
+    return 0
+
+
+def cmd_matrix(args):
+    from src.utils.geocoder import Geocoder
+    geocoder = Geocoder()
+    geocoder.profile = args.profile
+    points = _resolve_points(geocoder, args.points)
+    if points is None:
+        _emit(None)
+        return 1
+    with _quiet():
+        matrix = geocoder.get_matrix(points)
+    if matrix is None:
+        _emit(None)
+        return 1
+    _emit({
+        'points': [list(p) for p in points],
+        'durations': _finite(matrix['durations']),
+        'distances': _finite(matrix['distances'])
+    })
+    return 0
+
+
+def cmd_weather(args):
+    from src.utils.weather_service import WeatherService
+    lat, lon = args.point
+    service = WeatherService()
+    with _quiet():
+        current = service.get_current_weather(lat, lon)
+        forecast = service.get_forecast(lat, lon) if args.forecast else None
+    if current is None:
+        _emit(None)
+        return 1
+    result = {'lat': lat, 'lon': lon, 'current': current}
+    if args.forecast:
+        result['daily'] = forecast
+    _emit(result)
+    return 0
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--timing", action="store_true",
+                        help="report the elapsed time on stderr")
+    parser = argparse.ArgumentParser(prog="python -m src.cli",
+                                     description="CheapMaps services without the GUI (JSON on stdout)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    geocode = commands.add_parser("geocode", parents=[common],
+                                  help="place name (or \"My Location\") to coordinates")
+    geocode.add_argument("query")
+    geocode.add_argument("--offline", action="store_true",
+                         help="only use the local place index and cache")
+    geocode.set_defaults(handler=cmd_geocode)
+
+    reverse = commands.add_parser("reverse", parents=[common], help="coordinates to place name")
+    reverse.add_argument("point", type=_coordinate, metavar="LAT,LON")
+    reverse.set_defaults(handler=cmd_reverse)
+
+    route = commands.add_parser("route", parents=[common], help="route through two or more points")
+    route.add_argument("points", nargs="+", metavar="POINT",
+                       help="lat,lon or a place name")
+    route.add_argument("--profile", default="driving")
+    route.add_argument("--alternatives", action="store_true",
+                       help="include alternative routes")
+    route.add_argument("--geometry", action="store_true",
+                       help="include the polyline6-encoded geometry")
+    route.add_argument("--offline", action="store_true",
+                       help="only use the local road graph and cache")
+    route.set_defaults(handler=cmd_route)
+
+    matrix = commands.add_parser("matrix", parents=[common], help="duration/distance matrix between points")
+    matrix.add_argument("points", nargs="+", metavar="POINT",
+                        help="lat,lon or a place name")
+    matrix.add_argument("--profile", default="driving")
+    matrix.set_defaults(handler=cmd_matrix)
+
+    weather = commands.add_parser("weather", parents=[common], help="current weather at a point")
+    weather.add_argument("point", type=_coordinate, metavar="LAT,LON")
+    weather.add_argument("--forecast", action="store_true", help="include the 7-day forecast")
+    weather.set_defaults(handler=cmd_weather)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command in ('route', 'matrix') and len(args.points) < 2:
+        parser.error(f"{args.command} needs at least two points")
+    try:
+        status = args.handler(args)
+    except KeyboardInterrupt:
+        return 130
+    if args.timing:
+        print(f"{(time.perf_counter() - STARTED_AT) * 1000:.0f} ms", file=sys.stderr)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
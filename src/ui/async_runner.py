@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from PyQt5.QtCore import QObject, Qt, pyqtSignal, pyqtSlot
+from src.utils.async_client import AsyncClient
+
+
+class QtAsyncRunner(QObject):
+    """
+    Runs coroutines on one asyncio event loop and delivers results on the Qt
+    thread, like QtJobRunner does for the thread pool. The loop has a single
+    thread of its own, so any number of lookups can be in flight at once.
+
+    Submitting with the `key` of a call still pending cancels that call;
+    a result that arrives after being superseded is dropped.
+    """
+    delivered = pyqtSignal(object, object, object, object)
+
+    def __init__(self):
+        super().__init__()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever,
+                                       name="cheapmaps-asyncio", daemon=True)
+        self.thread.start()
+        self.pending = {}
+        self._client = None
+        self.delivered.connect(self._deliver, Qt.QueuedConnection)
+
+    @property
+    def client(self):
+        """
+        The AsyncClient bound to this runner's loop.
+        """
+        if self._client is None:
+            self._client = AsyncClient()
+        return self._client
+
+    def submit(self, coro_fn, *args, on_result=None, on_error=None, key=None, **kwargs):
+        if key is not None:
+            self.cancel(key)
+        future = asyncio.run_coroutine_threadsafe(coro_fn(*args, **kwargs), self.loop)
+        if key is not None:
+            self.pending[key] = future
+
+        def done(future):
+            # Runs on the loop thread; hand over to the Qt thread
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    self.delivered.emit(key, future, on_error, error)
+                else:
+                    print(f"Job error: {error}")
+            elif on_result:
+                self.delivered.emit(key, future, on_result, future.result())
+
+        future.add_done_callback(done)
+        return future
+
+    def cancel(self, key):
+        future = self.pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    @pyqtSlot(object, object, object, object)
+    def _deliver(self, key, future, callback, value):
+        if key is not None:
+            if self.pending.get(key) is not future:
+                return
+            del self.pending[key]
+        callback(value)
+
+
+_runner = None
+
+
+def get_async_runner():
+    """
+    Returns the shared runner; must first be called from the Qt thread.
+    """
+    global _runner
+    if _runner is None:
+        _runner = QtAsyncRunner()
+    return _runner
@@ -3,6 +3,7 @@ from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 class MapBridge(QObject):
     mapClickedSignal = pyqtSignal(float, float)
     routeSelectedSignal = pyqtSignal(int)
+    mapReadySignal = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
@@ -16,3 +17,6 @@ class MapBridge(QObject):
         print(f"Route selected: {index}")
         self.routeSelectedSignal.emit(index)
 
+    @pyqtSlot(str)
+    def mapReady(self, leaflet_source):
+        self.mapReadySignal.emit(leaflet_source)
@@ -0,0 +1,86 @@
+import time
+from PyQt5.QtWidgets import QCompleter, QListView
+from PyQt5.QtCore import Qt, QObject, QTimer, QStringListModel
+from src.utils.geocoder import Geocoder, merge_suggestions
+from src.utils.autocomplete import (AdaptiveDebounce, suggest_from_cache,
+                                    MIN_QUERY_LENGTH)
+from src.utils.job_scheduler import PRIORITY_INTERACTIVE
+from src.ui.job_runner import get_job_runner
+
+SUGGESTION_LIMIT = 5
+
+class LocationCompleter(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.completer = QCompleter()
+        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.completer.setFilterMode(Qt.MatchContains)
+        
+        popup = QListView()
+        self.completer.setPopup(popup)
+        
+        self.model = QStringListModel()
+        self.completer.setModel(self.model)
+        
+        self.debounce = AdaptiveDebounce()
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.debounce.interval())
+        self.timer.timeout.connect(self.start_worker)
+        
+        self.current_text = ""
+        self.geocoder = Geocoder()
+        self.cache = self.geocoder.cache
+        self.runner = get_job_runner()
+        # A newer keystroke supersedes the pending lookup of this field
+        self.job_key = f"suggest:{id(self)}"
+        # Latest query wins: results of older lookups are ignored
+        self.latest_seq = 0
+        
+    def update_text(self, text):
+        if len(text) < MIN_QUERY_LENGTH:
+            return 
+        self.current_text = text
+        
+        # Local index and cached result sets (including refinements of a
+        # cached prefix, e.g. "Bucha" from "Buch") answer immediately
+        if self.show_instant(text):
+            self.timer.stop()
+            self.runner.cancel(self.job_key)
+            return
+            
+        self.timer.setInterval(self.debounce.interval())
+        self.timer.start()
+        
+    def show_instant(self, query):
+        """
+        Shows whatever can be answered without the network.
+        Returns True if that answer is complete.
+        """
+        local = self.geocoder.local_suggest(query, SUGGESTION_LIMIT)
+        cached, complete = suggest_from_cache(self.cache, query, SUGGESTION_LIMIT)
+        suggestions = merge_suggestions(local, cached, SUGGESTION_LIMIT)
+        if suggestions:
+            self.model.setStringList(suggestions)
+        return complete or len(local) >= SUGGESTION_LIMIT or self.geocoder.offline
+        
+    def start_worker(self):
+        query = self.current_text
+        self.latest_seq += 1
+        seq = self.latest_seq
+        geocoder = self.geocoder
+        
+        def lookup():
+            start = time.perf_counter()
+            suggestions = geocoder.suggest(query, SUGGESTION_LIMIT)
+            return suggestions, (time.perf_counter() - start) * 1000
+            
+        self.runner.submit(lookup, priority=PRIORITY_INTERACTIVE, key=self.job_key,
+                           on_result=lambda result: self.handle_results(result, query, seq))
+        
+    def handle_results(self, result, query, seq):
+        suggestions, latency_ms = result
+        self.debounce.record(latency_ms)
+        if seq != self.latest_seq or suggestions is None:
+            return
+        self.model.setStringList(suggestions)
@@ -1,7 +1,7 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, 
-                             QPushButton, QLabel, QFrame, QScrollArea)
+                             QPushButton, QLabel, QFrame, QScrollArea, QCheckBox)
 from PyQt5.QtCore import Qt, pyqtSignal
-from src.utils.completer_helper import LocationCompleter
+from src.ui.completer_helper import LocationCompleter
 
 class WaypointRow(QWidget):
     move_up_signal = pyqtSignal(QWidget)
@@ -51,9 +51,13 @@ class WaypointRow(QWidget):
         
     def set_text(self, text):
         self.input.setText(text)
+        
+    def set_resolved(self, resolved):
+        self.input.setStyleSheet("border: 1px solid #00ff9d;" if resolved else "")
 
 class DirectionsPanel(QWidget):
     go_signal = pyqtSignal()
+    optimize_signal = pyqtSignal()
     request_map_pick = pyqtSignal(QWidget)
     
     def __init__(self):
@@ -80,11 +84,27 @@ class DirectionsPanel(QWidget):
         self.go_btn.setStyleSheet("font-weight: bold; background-color: #4CAF50; color: white;")
         self.go_btn.clicked.connect(self.go_signal.emit)
         
+        self.optimize_btn = QPushButton("Optimize")
+        self.optimize_btn.setToolTip("Reorder the stops for the shortest total driving time")
+        self.optimize_btn.clicked.connect(self.optimize_signal.emit)
+        
         self.controls_layout.addWidget(self.add_btn)
+        self.controls_layout.addWidget(self.optimize_btn)
         self.controls_layout.addWidget(self.go_btn)
         
+        self.keep_end_chk = QCheckBox("Keep destination last")
+        self.keep_end_chk.setChecked(True)
+        
+        self.status_lbl = QLabel("")
+        self.status_lbl.setStyleSheet("color: #888; font-size: 12px;")
+        self.status_lbl.setVisible(False)
+        
         self.layout.addWidget(self.scroll)
         self.layout.addLayout(self.controls_layout)
+        self.layout.addWidget(self.keep_end_chk)
+        self.layout.addWidget(self.status_lbl)
+        
+        self.active_rows = []
         
     def init_waypoints(self):
         self.add_waypoint("Start Location...")
@@ -145,6 +165,39 @@ class DirectionsPanel(QWidget):
     def get_locations(self):
         return [row.text().strip() for row in self.waypoints if row.text().strip()]
     
+    def begin_resolving(self):
+        # Rows in the same order as get_locations(), so worker indices map back
+        self.active_rows = [row for row in self.waypoints if row.text().strip()]
+        for row in self.waypoints:
+            row.set_resolved(False)
+        self.go_btn.setText("Cancel")
+        self.optimize_btn.setEnabled(False)
+        
+    def end_resolving(self):
+        self.go_btn.setText("Go")
+        self.optimize_btn.setEnabled(True)
+        
+    def set_progress(self, done, total, message):
+        self.status_lbl.setText(message)
+        self.status_lbl.setVisible(bool(message))
+        
+    def mark_resolved(self, index):
+        if 0 <= index < len(self.active_rows):
+            self.active_rows[index].set_resolved(True)
+    
+    def apply_order(self, order):
+        """
+        Reorders the rows that were resolved (get_locations() order) to
+        `order`; empty rows keep trailing after them.
+        """
+        rows = [self.active_rows[i] for i in order]
+        self.active_rows = rows
+        self.waypoints = rows + [row for row in self.waypoints if row not in rows]
+        self.refresh_layout()
+        
+    def keep_destination(self):
+        return self.keep_end_chk.isChecked()
+    
     def set_start_location(self, text):
         if self.waypoints:
             self.waypoints[0].set_text(text)
@@ -0,0 +1,61 @@
+from PyQt5.QtCore import QObject, Qt, pyqtSignal, pyqtSlot
+from src.utils.job_scheduler import get_scheduler, PRIORITY_NORMAL
+
+
+class QtJobRunner(QObject):
+    """
+    Submits work to the shared JobScheduler and delivers results on the Qt thread.
+    Every callback goes through the one queued `delivered` signal, and is
+    skipped if the job was cancelled or superseded in the meantime.
+    """
+    delivered = pyqtSignal(object, object, object)
+
+    def __init__(self, scheduler=None):
+        super().__init__()
+        self.scheduler = scheduler or get_scheduler()
+        self.delivered.connect(self._deliver, Qt.QueuedConnection)
+
+    def submit(self, fn, *args, on_result=None, on_error=None, priority=PRIORITY_NORMAL,
+               key=None, pass_token=False, **kwargs):
+        holder = {}
+
+        def emit_result(result):
+            if on_result:
+                self.delivered.emit(holder, on_result, result)
+
+        def emit_error(error):
+            if on_error:
+                self.delivered.emit(holder, on_error, error)
+            else:
+                print(f"Job error: {error}")
+
+        # The token is only known after submit returns, so the holder is passed
+        # along and read back on the Qt thread, by which time it is filled in.
+        token = self.scheduler.submit(fn, *args, priority=priority, key=key,
+                                      on_result=emit_result, on_error=emit_error,
+                                      pass_token=pass_token, **kwargs)
+        holder['token'] = token
+        return token
+
+    def cancel(self, key):
+        self.scheduler.cancel(key)
+
+    @pyqtSlot(object, object, object)
+    def _deliver(self, holder, callback, value):
+        token = holder.get('token')
+        if token is not None and token.cancelled:
+            return
+        callback(value)
+
+
+_runner = None
+
+
+def get_job_runner():
+    """
+    Returns the shared runner; must first be called from the Qt thread.
+    """
+    global _runner
+    if _runner is None:
+        _runner = QtJobRunner()
+    return _runner
@@ -1,5 +1,7 @@
 import os
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLineEdit, QPushButton, 
                              QLabel, QMessageBox, QFrame, QGraphicsDropShadowEffect)
@@ -9,38 +11,116 @@ from PyQt5.QtCore import QUrl, QThread, pyqtSignal, Qt, QSize
 from PyQt5.QtGui import QColor
 from src.utils.geocoder import Geocoder
 from src.ui.directions_panel import DirectionsPanel
-from src.utils.completer_helper import LocationCompleter
+from src.ui.completer_helper import LocationCompleter
 from src.ui.bridge import MapBridge
 from src.ui.weather_widget import WeatherWidget
 from src.ui.weather_widget import WeatherWidget
-from PyQt5.QtWidgets import QMenu, QAction
-import requests
+from PyQt5.QtWidgets import QMenu, QAction, QApplication
+from src.utils.job_scheduler import PRIORITY_INTERACTIVE, CancelToken, JobCancelled, job_context
+from src.utils.tour import optimize_order
+from src.ui.async_runner import get_async_runner
 from src.utils.resource_path import get_resource_path
+from src.utils.tile_server import get_tile_server
+from src.utils.tile_prefetch import TilePrefetcher
 
-class ReverseGeocodeWorker(QThread):
-    result_ready = pyqtSignal(str, float, float)
+class DirectionsWorker(QThread):
+    """
+    Geocodes all waypoints concurrently and requests the route, off the GUI thread.
+    Nominatim calls are paced by the shared HTTP rate limiter at interactive
+    priority; cancelling also abandons stops still waiting for a slot.
+    """
+    progress = pyqtSignal(int, int, str)
+    point_resolved = pyqtSignal(int, str, float, float)
+    order_optimized = pyqtSignal(object, float, float)
+    route_ready = pyqtSignal(object, object, object)
+    failed = pyqtSignal(str, str)
 
-    def __init__(self, lat, lng):
+    MAX_WORKERS = 4
+
+    def __init__(self, geocoder, locations, optimize=False, keep_destination=True):
         super().__init__()
-        self.lat = lat
-        self.lng = lng
+        self.geocoder = geocoder
+        self.locations = locations
+        self.optimize = optimize
+        self.keep_destination = keep_destination
+        self.token = CancelToken()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def is_cancelled(self):
+        return self.token.cancelled
 
     def run(self):
-        url = "https://nominatim.openstreetmap.org/reverse"
-        params = {
-            'lat': self.lat,
-            'lon': self.lng,
-            'format': 'json'
-        }
-        headers = {'User-Agent': 'ProiectLogis_MapApp/1.0'}
+        total = len(self.locations)
+        points = [None] * total
+        self.progress.emit(0, total, "Resolving stops...")
+
+        executor = ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, total))
         try:
-            resp = requests.get(url, params=params, headers=headers, timeout=3)
-            if resp.status_code == 200:
-                data = resp.json()
-                name = data.get('display_name', f"{self.lat:.4f}, {self.lng:.4f}")
-                self.result_ready.emit(name, self.lat, self.lng)
-        except Exception as e:
-            print(f"Reverse Geo Error: {e}")
+            futures = {executor.submit(self._resolve, txt): i for i, txt in enumerate(self.locations)}
+            done = 0
+            for future in as_completed(futures):
+                i = futures[future]
+                loc = future.result()
+                if self.is_cancelled():
+                    return
+                if not loc:
+                    self.token.cancel()
+                    self.failed.emit("Not Found", f"Unknown: {self.locations[i]}")
+                    return
+                points[i] = (loc['lat'], loc['lon'])
+                done += 1
+                self.point_resolved.emit(i, self.locations[i], loc['lat'], loc['lon'])
+                self.progress.emit(done, total, f"Resolved {done}/{total} stops")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if self.is_cancelled():
+            return
+        names = list(self.locations)
+        if self.optimize and total > 2:
+            order = self._optimize(points)
+            if order is None:
+                return
+            points = [points[i] for i in order]
+            names = [names[i] for i in order]
+
+        self.progress.emit(total, total, "Calculating route...")
+        routes = self.geocoder.get_route(points)
+        if self.is_cancelled():
+            return
+        if routes:
+            self.route_ready.emit(routes, points, names)
+        else:
+            self.failed.emit("Error", "Route not found.")
+
+    def _optimize(self, points):
+        total = len(points)
+        self.progress.emit(total, total, f"Optimizing order of {total} stops...")
+        try:
+            with job_context(PRIORITY_INTERACTIVE, self.token):
+                matrix = self.geocoder.get_matrix(points)
+        except JobCancelled:
+            return None
+        if self.is_cancelled():
+            return None
+        if matrix is None:
+            # Keep the typed order rather than failing the whole request
+            return list(range(total))
+        order, typed_cost, optimized_cost = optimize_order(matrix['durations'],
+                                                           fixed_end=self.keep_destination)
+        self.order_optimized.emit(order, typed_cost, optimized_cost)
+        return order
+
+    def _resolve(self, location_txt):
+        if self.is_cancelled():
+            return None
+        try:
+            with job_context(PRIORITY_INTERACTIVE, self.token):
+                return self.geocoder.resolve(location_txt)
+        except JobCancelled:
+            return None
 
 class StatsPanel(QWidget):
     def __init__(self, parent=None):
@@ -108,13 +188,18 @@ class ControlPanel(QWidget):
         self.setGraphicsEffect(shadow)
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, started_at=None):
         super().__init__()
+        self.started_at = started_at or time.perf_counter()
         self.setWindowTitle("CheapMaps 🌑")
         self.resize(1200, 800)
         
         self.geocoder = Geocoder()
+        # Single lookups (search, reverse, current location) run as coroutines
+        self.async_runner = get_async_runner()
+        self.client = self.async_runner.client
         self.pending_input_widget = None
+        self.directions_worker = None
         
         self.setup_ui()
         self.apply_styles()
@@ -228,6 +313,7 @@ class MainWindow(QMainWindow):
         self.bridge.mapClickedSignal.connect(self.handle_map_click)
         self.bridge.mapClickedSignal.connect(self.handle_map_click)
         self.bridge.routeSelectedSignal.connect(self.handle_route_selection)
+        self.bridge.mapReadySignal.connect(self.handle_map_ready)
         
         self.channel = QWebChannel()
         self.channel.registerObject("bridge", self.bridge)
@@ -237,7 +323,13 @@ class MainWindow(QMainWindow):
         
         self.web_view.settings().setAttribute(self.web_view.settings().WebAttribute.LocalContentCanAccessRemoteUrls, True)
         self.web_view.settings().setAttribute(self.web_view.settings().WebAttribute.LocalContentCanAccessFileUrls, True)
-        self.web_view.setUrl(QUrl.fromLocalFile(map_path))
+        # Leaflet loads tiles through the local MBTiles caching proxy
+        self.tile_server = get_tile_server()
+        self.tile_prefetcher = TilePrefetcher(self.tile_server.fetcher)
+        self.current_layer = 'dark'
+        map_url = QUrl.fromLocalFile(map_path)
+        map_url.setQuery(f"tiles={self.tile_server.base_url}")
+        self.web_view.setUrl(map_url)
         
         main_layout.addWidget(self.web_view)
         
@@ -310,6 +402,7 @@ class MainWindow(QMainWindow):
         
         self.directions_panel = DirectionsPanel()
         self.directions_panel.go_signal.connect(self.get_directions)
+        self.directions_panel.optimize_signal.connect(lambda: self.get_directions(optimize=True))
         self.directions_panel.request_map_pick.connect(self.enable_map_pick_mode)
         self.directions_panel.setVisible(False)
         
@@ -322,6 +415,22 @@ class MainWindow(QMainWindow):
         self.weather_widget = WeatherWidget(central_widget)
         # We'll position it in resizeEvent
 
+    def handle_map_ready(self, leaflet_source):
+        # Time-to-interactive: main() start until the QWebChannel is connected
+        elapsed_ms = (time.perf_counter() - self.started_at) * 1000
+        print(f"Map ready in {elapsed_ms:.0f} ms (leaflet: {leaflet_source})")
+        
+        bench_path = os.environ.get('CHEAPMAPS_STARTUP_BENCH')
+        if bench_path:
+            with open(bench_path, 'a') as f:
+                f.write(json.dumps({
+                    'time_to_map_ready_ms': round(elapsed_ms, 1),
+                    'leaflet_source': leaflet_source,
+                    'timestamp': time.time()
+                }) + "\n")
+            if os.environ.get('CHEAPMAPS_STARTUP_BENCH_EXIT'):
+                QApplication.instance().quit()
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         # Position Stats Center Bottom
@@ -358,6 +467,7 @@ class MainWindow(QMainWindow):
              self.control_panel.resize(380, self.control_panel.height())
 
     def switch_map_layer(self, layer_code):
+        self.current_layer = layer_code
         js_code = f"switchLayer('{layer_code}');"
         self.web_view.page().runJavaScript(js_code)
 
@@ -372,8 +482,10 @@ class MainWindow(QMainWindow):
         if not query:
             return
             
-        result = self.geocoder.search(query)
-        
+        self.async_runner.submit(self.client.search, query, key='search',
+                                 on_result=lambda result: self.show_search_result(query, result))
+
+    def show_search_result(self, query, result):
         if result:
             lat = result['lat']
             lon = result['lon']
@@ -386,59 +498,90 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, "Not Found", f"Could not find location: {query}")
 
-    def get_directions(self):
+    def get_directions(self, optimize=False):
+        if self.directions_worker and self.directions_worker.isRunning():
+            self.cancel_directions()
+            return
+
         all_points_txt = self.directions_panel.get_locations()
         
         if len(all_points_txt) < 2:
             QMessageBox.warning(self, "Missing Info", "Start & End required.")
             return
 
-        geocoded_points = []
-        for location_txt in all_points_txt:
-            if location_txt.lower() == "my location":
-                loc = self.geocoder.get_current_location()
-            else:
-                loc = self.geocoder.search(location_txt)
-            if not loc:
-                QMessageBox.warning(self, "Not Found", f"Unknown: {location_txt}")
-                return
-            geocoded_points.append((loc['lat'], loc['lon']))
-             
-        routes = self.geocoder.get_route(geocoded_points)
-        if routes:
-            self.current_routes = routes # Store for selection
-            routes_json = json.dumps(routes)
-            
-            waypoints_manifest = []
-            
-            waypoints_manifest.append({
-                'lat': geocoded_points[0][0], 'lng': geocoded_points[0][1],
-                'name': all_points_txt[0], 'type': 'start'
-            })
-            
-            for i in range(1, len(geocoded_points) - 1):
-                 waypoints_manifest.append({
-                    'lat': geocoded_points[i][0], 'lng': geocoded_points[i][1],
-                    'name': all_points_txt[i], 'type': 'stop', 'index': i
-                })
-            
-            waypoints_manifest.append({
-                'lat': geocoded_points[-1][0], 'lng': geocoded_points[-1][1],
-                'name': all_points_txt[-1], 'type': 'end'
-            })
-            
-            waypoints_json = json.dumps(waypoints_manifest)
-            js_code = f"drawRoute({routes_json}, {waypoints_json});"
-            self.web_view.page().runJavaScript(js_code)
-            
-            primary_route = routes[0]
-            alt_count = len(routes) - 1
-            self.stats_panel.update_stats(primary_route['duration'], primary_route['distance'], alt_count)
-            self.stats_panel.setVisible(True)
-            self.stats_panel.raise_()
-            
+        self.directions_panel.begin_resolving()
+        self.directions_worker = DirectionsWorker(self.geocoder, all_points_txt, optimize,
+                                                  self.directions_panel.keep_destination())
+        self.directions_worker.progress.connect(self.directions_panel.set_progress)
+        self.directions_worker.point_resolved.connect(self.handle_point_resolved)
+        self.directions_worker.order_optimized.connect(self.handle_order_optimized)
+        self.directions_worker.route_ready.connect(self.show_route)
+        self.directions_worker.failed.connect(self.handle_directions_failed)
+        self.directions_worker.finished.connect(self.directions_panel.end_resolving)
+        self.directions_worker.start()
+
+    def cancel_directions(self):
+        if self.directions_worker:
+            self.directions_worker.cancel()
+            self.directions_panel.set_progress(0, 0, "Cancelled.")
+
+    def handle_point_resolved(self, index, name, lat, lon):
+        self.directions_panel.mark_resolved(index)
+        self.statusBar().showMessage(f"📍 {name}")
+
+    def handle_order_optimized(self, order, typed_sec, optimized_sec):
+        self.directions_panel.apply_order(order)
+        saved_min = (typed_sec - optimized_sec) / 60
+        if saved_min >= 1:
+            self.statusBar().showMessage(
+                f"🔀 Optimized stop order saves {saved_min:.0f} min "
+                f"({typed_sec / 60:.0f} → {optimized_sec / 60:.0f} min)")
         else:
-            QMessageBox.warning(self, "Error", "Route not found.")
+            self.statusBar().showMessage("🔀 Typed stop order is already the fastest")
+
+    def handle_directions_failed(self, title, message):
+        self.directions_panel.set_progress(0, 0, "")
+        QMessageBox.warning(self, title, message)
+
+    def show_route(self, routes, geocoded_points, all_points_txt):
+        self.current_routes = routes # Store for selection
+        # The map only needs the simplified levels, not the full geometry
+        routes_json = json.dumps([
+            {k: v for k, v in route.items() if k != 'coordinates'} for route in routes
+        ])
+        
+        waypoints_manifest = []
+        
+        waypoints_manifest.append({
+            'lat': geocoded_points[0][0], 'lng': geocoded_points[0][1],
+            'name': all_points_txt[0], 'type': 'start'
+        })
+        
+        for i in range(1, len(geocoded_points) - 1):
+             waypoints_manifest.append({
+                'lat': geocoded_points[i][0], 'lng': geocoded_points[i][1],
+                'name': all_points_txt[i], 'type': 'stop', 'index': i
+            })
+        
+        waypoints_manifest.append({
+            'lat': geocoded_points[-1][0], 'lng': geocoded_points[-1][1],
+            'name': all_points_txt[-1], 'type': 'end'
+        })
+        
+        waypoints_json = json.dumps(waypoints_manifest)
+        js_code = f"drawRoute({routes_json}, {waypoints_json});"
+        self.web_view.page().runJavaScript(js_code)
+        
+        primary_route = routes[0]
+        alt_count = len(routes) - 1
+        self.stats_panel.update_stats(primary_route['duration'], primary_route['distance'], alt_count)
+        self.stats_panel.setVisible(True)
+        self.stats_panel.raise_()
+        self.directions_panel.set_progress(0, 0, "")
+        
+        # Warm the tile cache along the chosen route while the user looks at it
+        self.tile_prefetcher.prefetch(primary_route['coordinates'], self.current_layer,
+                                      retina=self.devicePixelRatioF() > 1)
             
     def handle_route_selection(self, index):
         if hasattr(self, 'current_routes') and 0 <= index < len(self.current_routes):
@@ -462,11 +605,17 @@ class MainWindow(QMainWindow):
             
             # Update Stats
             primary_route = self.current_routes[0]
+            # No-op when prefetch is off for the layer or this corridor is already cached
+            self.tile_prefetcher.prefetch(primary_route['coordinates'], self.current_layer,
+                                          retina=self.devicePixelRatioF() > 1)
             alt_count = len(self.current_routes) - 1
             self.stats_panel.update_stats(primary_route['duration'], primary_route['distance'], alt_count)
 
     def use_current_location(self):
-        loc = self.geocoder.get_current_location()
+        self.async_runner.submit(self.client.get_current_location, key='current_location',
+                                 on_result=self.show_current_location)
+
+    def show_current_location(self, loc):
         if loc:
             lat = loc['lat']
             lon = loc['lon']
@@ -502,9 +651,8 @@ class MainWindow(QMainWindow):
             return
             
         self.statusBar().showMessage("✨ Resolving address...")
-        self.geo_worker = ReverseGeocodeWorker(lat, lng)
-        self.geo_worker.result_ready.connect(self.finish_map_pick)
-        self.geo_worker.start()
+        self.async_runner.submit(self.client.reverse, lat, lng, key='reverse',
+                                 on_result=lambda name: self.finish_map_pick(name or f"{lat:.4f}, {lng:.4f}", lat, lng))
         
     def finish_map_pick(self, name, lat, lng):
         if self.pending_input_widget:
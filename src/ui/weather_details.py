@@ -3,6 +3,8 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt, QDate, QPoint
 from PyQt5.QtGui import QColor, QLinearGradient, QPalette, QBrush
 from src.utils.weather_service import WeatherService
+from src.utils.job_scheduler import PRIORITY_INTERACTIVE
+from src.ui.job_runner import get_job_runner
 
 class WeatherDayCard(QFrame):
     def __init__(self, day_name, date_str, emoji, high, low, prob, parent=None):
@@ -167,16 +169,36 @@ class WeatherDetailDialog(QDialog):
         self.scroll.setWidget(content)
         main_layout.addWidget(self.scroll)
         
-        # Fetch Data
+        # Fetch Data: usually already cached by WeatherWidget.fetch_weather,
+        # otherwise the dialog opens with a placeholder and fills in later.
         self.service = WeatherService()
-        data = self.service.get_forecast(lat, lon)
+        self.runner = get_job_runner()
+        self.status_lbl = None
+        
+        bundle = self.service.peek_bundle(lat, lon)
+        if bundle and bundle.get('daily'):
+            self.populate_forecast(bundle['daily'])
+        else:
+            self.show_message("Loading forecast...")
+            self.runner.submit(self.service.get_forecast, lat, lon,
+                               priority=PRIORITY_INTERACTIVE, key='weather.forecast',
+                               on_result=self.show_forecast)
+            self.finished.connect(lambda _: self.runner.cancel('weather.forecast'))
+
+    def show_message(self, text):
+        self.status_lbl = QLabel(text)
+        self.status_lbl.setStyleSheet("color: rgba(255,255,255,0.5); font-style: italic;")
+        self.status_lbl.setAlignment(Qt.AlignCenter)
+        self.content_layout.addWidget(self.status_lbl)
+
+    def show_forecast(self, data):
+        if self.status_lbl:
+            self.status_lbl.deleteLater()
+            self.status_lbl = None
         if data:
             self.populate_forecast(data)
         else:
-            err = QLabel("Could not load forecast data.")
-            err.setStyleSheet("color: rgba(255,255,255,0.5); font-style: italic;")
-            err.setAlignment(Qt.AlignCenter)
-            self.content_layout.addWidget(err)
+            self.show_message("Could not load forecast data.")
 
     def populate_forecast(self, data):
         times = data.get('time', [])
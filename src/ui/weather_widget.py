@@ -1,21 +1,9 @@
 from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QGraphicsDropShadowEffect
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor, QFont, QCursor
 from src.utils.weather_service import WeatherService
 from src.ui.weather_details import WeatherDetailDialog
-
-class WeatherWorker(QThread):
-    result_ready = pyqtSignal(object)
-
-    def __init__(self, lat, lon):
-        super().__init__()
-        self.lat = lat
-        self.lon = lon
-        self.service = WeatherService()
-
-    def run(self):
-        data = self.service.get_current_weather(self.lat, self.lon)
-        self.result_ready.emit(data)
+from src.ui.async_runner import get_async_runner
 
 class WeatherWidget(QWidget):
     def __init__(self, parent=None):
@@ -34,6 +22,8 @@ class WeatherWidget(QWidget):
         self.current_lon = 0
         # Default name if none provided/known
         self.location_name = "Selected Location"
+        self.service = WeatherService()
+        self.runner = get_async_runner()
         
         # UI Elements
         self.lbl_icon = QLabel("🌍")
@@ -85,9 +75,11 @@ class WeatherWidget(QWidget):
         self.lbl_desc.setText("Loading...")
         self.show()
         
-        self.worker = WeatherWorker(lat, lon)
-        self.worker.result_ready.connect(self.update_ui)
-        self.worker.start()
+        # A newer location supersedes a fetch still in flight. The request also
+        # brings the 7-day forecast into the cache, so the detail dialog opens
+        # without waiting on the network.
+        self.runner.submit(self.runner.client.get_current_weather, lat, lon,
+                           key='weather.current', on_result=self.update_ui)
 
     def update_ui(self, data):
         if data:
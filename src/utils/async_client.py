@@ -0,0 +1,192 @@
+import asyncio
+import requests
+from src.utils.async_http import AsyncSession
+from src.utils.geo_cache import coord_key
+from src.utils.geocoder import Geocoder, parse_location, parse_routes, parse_search
+from src.utils.job_scheduler import PRIORITY_INTERACTIVE
+from src.utils.weather_service import WeatherService, grid_cell, parse_bundle
+
+# Requests one client keeps in flight at once; the rest wait their turn
+DEFAULT_CONCURRENCY = 32
+
+
+async def _gather(coros):
+    # Like asyncio.gather, but a failure cancels the siblings still running
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class AsyncClient:
+    """
+    asyncio version of the Geocoder and WeatherService operations: search,
+    reverse, get_route, get_current_location, get_current_weather and
+    get_forecast, with the same results, caches, backends and rate limits.
+
+    All requests go through one AsyncSession (keep-alive connections per
+    host) and at most `max_concurrency` are in flight; cancelling a call's
+    task cancels its requests. Use one client per event loop.
+    """
+
+    def __init__(self, geocoder=None, weather=None, max_concurrency=DEFAULT_CONCURRENCY,
+                 priority=PRIORITY_INTERACTIVE):
+        self.geocoder = geocoder or Geocoder()
+        self.weather = weather or WeatherService()
+        self.session = AsyncSession()
+        self.limit = asyncio.Semaphore(max_concurrency)
+        self.priority = priority
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.session.close()
+
+    async def _get_json(self, service, path, params=None, timeout=None):
+        async with self.limit:
+            response = await service.get_async(self.session, path, params=params,
+                                               timeout=timeout, priority=self.priority)
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError as e:
+            raise requests.RequestException(f"Invalid response: {e}")
+
+    async def _in_thread(self, fn, *args):
+        # CPU-bound steps (polyline decoding, LODs, leg splitting) and the
+        # SQLite caches and place index stay off the loop
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def lookup(self, query):
+        """
+        (result, source) like Geocoder.lookup; raises requests.RequestException.
+        """
+        geocoder = self.geocoder
+        known = await self._in_thread(geocoder._known_lookup, query)
+        if known is not None:
+            return known
+        data = await self._get_json(geocoder.nominatim, '/search', geocoder._search_params(query))
+        return await self._in_thread(geocoder._store_lookup, query, parse_search(data))
+
+    async def search(self, query):
+        try:
+            return (await self.lookup(query))[0]
+        except requests.RequestException as e:
+            print(f"Geocoding error: {e}")
+            return None
+
+    async def reverse(self, lat, lon):
+        key = coord_key(lat, lon)
+        cached = await self._in_thread(self.geocoder.cache.get, 'reverse', key)
+        if cached is not None:
+            return cached
+
+        params = {
+            'lat': lat,
+            'lon': lon,
+            'format': 'json'
+        }
+        try:
+            data = await self._get_json(self.geocoder.nominatim, '/reverse', params, timeout=3)
+        except requests.RequestException as e:
+            print(f"Reverse Geo Error: {e}")
+            return None
+        name = data.get('display_name')
+        if name:
+            await self._in_thread(self.geocoder.cache.set, 'reverse', key, name)
+        return name
+
+    async def resolve(self, location_txt):
+        if location_txt.strip().lower() == "my location":
+            return await self.get_current_location()
+        return await self.search(location_txt)
+
+    async def get_current_location(self):
+        try:
+            return parse_location(await self._get_json(self.geocoder.ip_api, '/json'))
+        except (requests.RequestException, KeyError, ValueError) as e:
+            print(f"Location error: {e}")
+            return None
+
+    async def get_route(self, coordinates_list, geometries='polyline6'):
+        """
+        Same routes as Geocoder.get_route (and the same cache entries).
+        """
+        geocoder = self.geocoder
+        if len(coordinates_list) < 2:
+            return None
+
+        if geocoder.local_router is not None and geocoder.profile == 'driving':
+            routes = await self._in_thread(geocoder._get_local_route, coordinates_list)
+            if routes is not None or geocoder.offline:
+                return routes
+        elif geocoder.offline:
+            return None
+
+        key = geocoder._route_cache_key(coordinates_list, geometries)
+        cached = await self._in_thread(geocoder.route_cache.get, key)
+        if cached is not None:
+            return cached
+
+        try:
+            if len(coordinates_list) > 2:
+                routes = await self._get_leg_route(coordinates_list, geometries)
+            else:
+                routes, _ = await self._request_routes(coordinates_list, geometries, alternatives=True)
+        except requests.RequestException as e:
+            print(f"Routing error: {e}")
+            return None
+        return await self._in_thread(geocoder._cache_routes, key, routes)
+
+    async def _request_routes(self, coordinates_list, geometries, alternatives=False):
+        path, params = self.geocoder._route_request(coordinates_list, geometries, alternatives)
+        data = await self._get_json(self.geocoder.osrm, path, params)
+        return await self._in_thread(parse_routes, data, geometries), data
+
+    async def _get_leg_route(self, coordinates_list, geometries):
+        # Geocoder._get_leg_route with the chunks as tasks instead of threads
+        geocoder = self.geocoder
+        keys, legs, chunks = await self._in_thread(geocoder._plan_legs, coordinates_list)
+
+        async def fetch(chunk):
+            first, last = chunk
+            routes, data = await self._request_routes(coordinates_list[first:last + 1], geometries)
+            return await self._in_thread(geocoder._store_legs, keys[first:last], routes, data)
+
+        results = await _gather(fetch(chunk) for chunk in chunks) if chunks else []
+        return await self._in_thread(geocoder._join_legs, legs, chunks, results)
+
+    async def get_weather_bundle(self, lat, lon):
+        """
+        WeatherService.get_weather_bundle; concurrent calls for one cell
+        share a request through the session's coalescing.
+        """
+        bundle = self.weather.peek_bundle(lat, lon)
+        if bundle is not None:
+            return bundle
+        cell = grid_cell(lat, lon)
+        try:
+            data = await self._get_json(self.weather.open_meteo, '/v1/forecast',
+                                        self.weather._bundle_params(cell), timeout=5)
+        except requests.RequestException as e:
+            print(f"Weather API error: {e}")
+            return None
+        return self.weather._store_bundle(cell, parse_bundle(data))
+
+    async def get_current_weather(self, lat, lon):
+        bundle = await self.get_weather_bundle(lat, lon)
+        if bundle and bundle.get('current_weather'):
+            return self.weather._parse_current(bundle['current_weather'])
+        return None
+
+    async def get_forecast(self, lat, lon):
+        bundle = await self.get_weather_bundle(lat, lon)
+        if bundle:
+            return bundle.get('daily')
+        return None
@@ -0,0 +1,309 @@
+import asyncio
+import base64
+import json
+import ssl
+import time
+import zlib
+from collections import deque
+from urllib.parse import unquote, urlencode, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+import requests
+from requests.structures import CaseInsensitiveDict
+from src.utils import http_client
+from src.utils.job_scheduler import PRIORITY_NORMAL
+
+# Idle keep-alive connections kept per host, and how long they may idle
+# before they are assumed closed by the server
+POOL_MAXSIZE = http_client.POOL_MAXSIZE
+IDLE_TIMEOUT = 30
+MAX_HEADER_BYTES = 64 * 1024
+# Only what _decode understands, whatever the requests session would accept
+ACCEPT_ENCODING = 'gzip, deflate'
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+
+
+class AsyncResponse:
+    """
+    The parts of requests.Response the services use.
+    """
+
+    def __init__(self, url, status_code, headers, content, sent_at):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.sent_at = sent_at
+
+    @property
+    def ok(self):
+        # Redirects are followed, so a 3xx that gets here has no usable body
+        return self.status_code < 300
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = time.monotonic()
+
+    def close(self):
+        self.writer.close()
+
+
+def _split_timeout(timeout):
+    timeout = timeout or http_client.DEFAULT_TIMEOUT
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+def _decode(content, encoding):
+    if encoding == 'gzip':
+        return zlib.decompress(content, 16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(content)
+        except zlib.error:
+            return zlib.decompress(content, -zlib.MAX_WBITS)
+    return content
+
+
+def _proxy_for(scheme, hostname):
+    # Same environment (or system) settings requests honours
+    if proxy_bypass(hostname):
+        return None
+    proxies = getproxies()
+    url = proxies.get(scheme) or proxies.get('all')
+    if not url:
+        return None
+    if '://' not in url:
+        url = 'http://' + url
+    return urlsplit(url)
+
+
+def _basic_auth(proxy):
+    credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+    return 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+
+
+class AsyncSession:
+    """
+    Minimal asyncio HTTP/1.1 GET client with per-host keep-alive pools,
+    for use from one event loop.
+
+    Sends the same headers as http_client, waits on the same per-host rate
+    limiters (so sync and async requests share Nominatim's budget), and
+    coalesces identical requests in flight. Like requests, it goes through
+    the proxies in HTTP(S)_PROXY unless NO_PROXY exempts the host (https
+    through a CONNECT tunnel). Errors are raised as the requests exception
+    types the services already handle, redirects are followed, and
+    responses carry `sent_at` like http_client's. Cancelling the awaiting
+    task closes the connection it was using.
+    """
+
+    def __init__(self, max_per_host=POOL_MAXSIZE):
+        self.max_per_host = max_per_host
+        self.idle = {}
+        self.slots = {}
+        self.inflight = {}
+        self.coalesced = 0
+        self.ssl_context = None
+
+    async def get(self, url, params=None, headers=None, timeout=None, priority=PRIORITY_NORMAL):
+        key = http_client._request_key(url, params, headers)
+        entry = self.inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._follow(url, params, headers, timeout, priority))
+            entry = self.inflight[key] = {'task': task, 'waiters': 0}
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        entry['waiters'] += 1
+        try:
+            return await asyncio.shield(entry['task'])
+        except asyncio.CancelledError:
+            # Only abandon the request once nobody is waiting for it
+            entry['waiters'] -= 1
+            if entry['waiters'] == 0:
+                entry['task'].cancel()
+            raise
+
+    async def _follow(self, url, params, headers, timeout, priority):
+        # GET, following redirects like requests does
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await self._send(url, params, headers, timeout, priority)
+            location = response.headers.get('location')
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                return response
+            url, params = urljoin(response.url, location), None
+        raise requests.TooManyRedirects(f"Exceeded {MAX_REDIRECTS} redirects: {url}")
+
+    async def _send(self, url, params, headers, timeout, priority):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise requests.exceptions.InvalidURL(f"Invalid URL: {url}")
+        limiter = http_client.get_rate_limiter(parts.hostname)
+        if limiter is not None:
+            await limiter.acquire_async(priority)
+
+        target = parts.path or '/'
+        query = '&'.join(q for q in (parts.query, urlencode(params or {})) if q)
+        if query:
+            target += '?' + query
+        full_url = f"{parts.scheme}://{parts.netloc}{target}"
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        host = (parts.scheme, parts.hostname, port)
+        proxy = _proxy_for(parts.scheme, parts.hostname)
+
+        if proxy is not None and parts.scheme == 'http':
+            # Plain HTTP goes to the proxy with the absolute URL
+            lines = [f"GET {full_url} HTTP/1.1", f"Host: {parts.netloc}"]
+            if proxy.username:
+                lines.append(f"Proxy-Authorization: {_basic_auth(proxy)}")
+        else:
+            lines = [f"GET {target} HTTP/1.1", f"Host: {parts.netloc}"]
+        merged = CaseInsensitiveDict(http_client.get_session().headers)
+        merged.update(headers or {})
+        merged['Accept-Encoding'] = ACCEPT_ENCODING
+        lines += [f"{name}: {value}" for name, value in merged.items()]
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        connect_timeout, read_timeout = _split_timeout(timeout)
+        if host not in self.slots:
+            self.slots[host] = asyncio.Semaphore(self.max_per_host)
+        async with self.slots[host]:
+            sent_at = time.monotonic()
+            # A pooled connection may have been closed by the server in the
+            # meantime; that only shows when we use it, so retry once fresh.
+            for attempt in range(2):
+                conn, reused = self._pooled(host), True
+                if conn is None:
+                    conn, reused = await self._connect(host, connect_timeout, proxy), False
+                try:
+                    conn.writer.write(request)
+                    status, response_headers, content, keep_alive = await asyncio.wait_for(
+                        self._read_response(conn.reader), read_timeout)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    conn.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise requests.ConnectionError(f"{full_url}: {e}")
+                except asyncio.TimeoutError:
+                    conn.close()
+                    raise requests.exceptions.ReadTimeout(f"{full_url}: read timed out")
+                except (ValueError, zlib.error, asyncio.LimitOverrunError) as e:
+                    conn.close()
+                    raise requests.RequestException(f"{full_url}: bad response: {e}")
+                except BaseException:
+                    conn.close()
+                    raise
+                if keep_alive:
+                    conn.idle_since = time.monotonic()
+                    self.idle.setdefault(host, deque()).append(conn)
+                else:
+                    conn.close()
+                return AsyncResponse(full_url, status, response_headers, content, sent_at)
+
+    def _pooled(self, host):
+        pool = self.idle.get(host)
+        now = time.monotonic()
+        while pool:
+            conn = pool.pop()
+            if now - conn.idle_since < IDLE_TIMEOUT and not conn.reader.at_eof():
+                return conn
+            conn.close()
+        return None
+
+    def _ssl(self):
+        if self.ssl_context is None:
+            self.ssl_context = ssl.create_default_context()
+        return self.ssl_context
+
+    async def _connect(self, host, timeout, proxy=None):
+        scheme, hostname, port = host
+        context = self._ssl() if scheme == 'https' else None
+        if proxy is None:
+            address, address_ssl = (hostname, port), context
+        else:
+            proxy_port = proxy.port or (443 if proxy.scheme == 'https' else 80)
+            address = (proxy.hostname, proxy_port)
+            address_ssl = self._ssl() if proxy.scheme == 'https' else None
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(*address, ssl=address_ssl, limit=MAX_HEADER_BYTES),
+                timeout)
+            if proxy is not None and scheme == 'https':
+                await asyncio.wait_for(self._tunnel(reader, writer, proxy, hostname, port, context),
+                                       timeout)
+        except asyncio.TimeoutError:
+            raise requests.exceptions.ConnectTimeout(f"{hostname}:{port}: connect timed out")
+        except requests.RequestException:
+            raise
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise requests.ConnectionError(f"{hostname}:{port}: {e}")
+        return _Connection(reader, writer)
+
+    async def _tunnel(self, reader, writer, proxy, hostname, port, context):
+        # CONNECT through the proxy, then TLS to the real host over the tunnel
+        lines = [f"CONNECT {hostname}:{port} HTTP/1.1", f"Host: {hostname}:{port}"]
+        if proxy.username:
+            lines.append(f"Proxy-Authorization: {_basic_auth(proxy)}")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        head = await reader.readuntil(b'\r\n\r\n')
+        status_line = head.split(b'\r\n', 1)[0].decode('latin-1')
+        status = status_line.split(' ', 2)[1] if ' ' in status_line else ''
+        if status != '200':
+            writer.close()
+            raise requests.exceptions.ProxyError(f"Proxy refused CONNECT to {hostname}:{port}: {status_line}")
+        await writer.start_tls(context, server_hostname=hostname)
+
+    async def _read_response(self, reader):
+        head = await reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        version, status = status_line.split(' ', 2)[:2]
+        headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        status = int(status)
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if status in (204, 304) or 100 <= status < 200:
+            content = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    # Skip trailers up to the final empty line
+                    while (await reader.readuntil(b'\r\n')) != b'\r\n':
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b''.join(chunks)
+        elif 'content-length' in headers:
+            content = await reader.readexactly(int(headers['content-length']))
+        else:
+            content = await reader.read()
+            keep_alive = False
+        return status, headers, _decode(content, headers.get('content-encoding', '').lower()), keep_alive
+
+    async def close(self):
+        for pool in self.idle.values():
+            for conn in pool:
+                conn.close()
+        self.idle.clear()
@@ -0,0 +1,88 @@
+import re
+import unicodedata
+from src.utils.geo_cache import normalize_query
+
+MIN_QUERY_LENGTH = 3
+
+# Debounce bounds (ms) and the starting latency guess before any sample
+MIN_DEBOUNCE_MS = 150
+MAX_DEBOUNCE_MS = 700
+INITIAL_LATENCY_MS = 500
+LATENCY_SMOOTHING = 0.3
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _fold(text):
+    # Lowercase and strip diacritics so 'bucur' refines 'București'
+    text = unicodedata.normalize('NFKD', text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def refine(query, suggestions):
+    """
+    Keeps the suggestions in which every word of the query starts some word
+    of the suggestion, in their original order.
+    """
+    tokens = _WORD.findall(_fold(query))
+    if not tokens:
+        return list(suggestions)
+    refined = []
+    for suggestion in suggestions:
+        words = _WORD.findall(_fold(suggestion))
+        if all(any(word.startswith(token) for word in words) for token in tokens):
+            refined.append(suggestion)
+    return refined
+
+
+def cached_prefix_results(cache, query):
+    """
+    Finds the longest cached query that is a prefix of `query`.
+    Returns (prefix, suggestions), or (None, None) if there is none.
+    """
+    key = normalize_query(query)
+    for end in range(len(key) - 1, MIN_QUERY_LENGTH - 1, -1):
+        prefix = key[:end]
+        suggestions = cache.get('suggest', prefix)
+        if suggestions is not None:
+            return prefix, suggestions
+    return None, None
+
+
+def suggest_from_cache(cache, query, limit):
+    """
+    Answers a query from cached result sets without the network.
+    Returns (suggestions, complete): `complete` is True when no remote lookup
+    is needed, either an exact cache hit or a refinement of a prefix whose
+    result set was already exhaustive (fewer than `limit` results).
+    """
+    exact = cache.get('suggest', normalize_query(query))
+    if exact is not None:
+        return exact, True
+
+    prefix, results = cached_prefix_results(cache, query)
+    if results is None:
+        return [], False
+    refined = refine(query, results)
+    return refined, bool(refined) and len(results) < limit
+
+
+class AdaptiveDebounce:
+    """
+    Debounce interval that follows observed lookup latency: a fast backend
+    gets a snappy interval, a slow one waits longer so fewer requests are
+    made only to be superseded by the next keystroke.
+    """
+
+    def __init__(self, min_ms=MIN_DEBOUNCE_MS, max_ms=MAX_DEBOUNCE_MS,
+                 initial_latency_ms=INITIAL_LATENCY_MS, smoothing=LATENCY_SMOOTHING):
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.smoothing = smoothing
+        self.latency_ms = initial_latency_ms
+
+    def record(self, latency_ms):
+        self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+
+    def interval(self):
+        return int(min(self.max_ms, max(self.min_ms, self.latency_ms)))
@@ -0,0 +1,335 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from src.utils import http_client
+from src.utils.job_scheduler import JobCancelled, current_priority, current_token, job_context
+from src.utils.resource_path import get_data_path
+
+# Public endpoints used when nothing is configured. Override per service
+# with CHEAPMAPS_<SERVICE>_URLS (comma separated, e.g.
+# CHEAPMAPS_OSRM_URLS=http://osrm.internal:5000,http://router.project-osrm.org)
+# or a {"service": ["url", ...]} map in ~/.cheapmaps/backends.json.
+DEFAULT_BACKENDS = {
+    'nominatim': ['https://nominatim.openstreetmap.org'],
+    'osrm': ['http://router.project-osrm.org'],
+    'open_meteo': ['https://api.open-meteo.com'],
+    'ip_api': ['http://ip-api.com'],
+}
+
+# Endpoint health: after FAILURE_THRESHOLD consecutive failures an endpoint
+# is skipped for a cooldown that doubles on every further failure.
+FAILURE_THRESHOLD = 3
+BASE_COOLDOWN = 15
+MAX_COOLDOWN = 300
+LATENCY_SAMPLES = 200
+# Hedge after the primary's p95 latency, but not before we have this many
+# samples (until then DEFAULT_HEDGE_DELAY is used) and never sooner than
+# MIN_HEDGE_DELAY so a fast endpoint is not doubled on every request.
+MIN_LATENCY_SAMPLES = 20
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+HEDGE_WORKERS = 8
+
+
+class Endpoint:
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    def healthy(self, now=None):
+        return (now or time.monotonic()) >= self.down_until
+
+    def record_success(self, latency):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.down_until = 0.0
+
+    def record_failure(self):
+        with self.lock:
+            self.requests += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            excess = self.consecutive_failures - FAILURE_THRESHOLD
+            if excess >= 0:
+                self.down_until = time.monotonic() + min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** excess)
+
+    def percentile(self, q):
+        with self.lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+    def hedge_delay(self):
+        with self.lock:
+            enough = len(self.latencies) >= MIN_LATENCY_SAMPLES
+        if not enough:
+            return DEFAULT_HEDGE_DELAY
+        return max(MIN_HEDGE_DELAY, self.percentile(0.95))
+
+    def stats(self):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        with self.lock:
+            return {
+                'url': self.url,
+                'requests': self.requests,
+                'failures': self.failures,
+                'healthy': self.healthy(),
+                'p50_ms': None if p50 is None else p50 * 1000,
+                'p95_ms': None if p95 is None else p95 * 1000
+            }
+
+
+def _is_endpoint_failure(response):
+    # Overload and server errors count against the endpoint; other 4xx are
+    # the caller's problem and go back to it like any response.
+    return response.status_code == 429 or response.status_code >= 500
+
+
+class Service:
+    """
+    One logical backend (e.g. 'osrm') served by one or more endpoints.
+
+    `get` tries healthy endpoints in configured order. If the first has not
+    answered within its p95 latency the same request is sent to the next
+    one as well (a hedge) and whichever answers first wins. Failed or
+    unhealthy endpoints are skipped until their cooldown passes.
+    """
+
+    def __init__(self, name, urls, hedge=True):
+        if not urls:
+            raise ValueError(f"No endpoints configured for {name}")
+        self.name = name
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.hedge = hedge
+        self.hedges = 0
+
+    @property
+    def base_url(self):
+        return self.ordered()[0].url
+
+    def ordered(self):
+        now = time.monotonic()
+        healthy = [e for e in self.endpoints if e.healthy(now)]
+        # With everything down, try the endpoint that recovers first
+        return healthy or sorted(self.endpoints, key=lambda e: e.down_until)
+
+    def _attempt(self, endpoint, path, params, headers, timeout, priority, token):
+        try:
+            with job_context(priority, token):
+                response = http_client.get(endpoint.url + path, params=params,
+                                           headers=headers, timeout=timeout)
+        except JobCancelled:
+            raise
+        except requests.RequestException:
+            endpoint.record_failure()
+            raise
+        return self._check(endpoint, response)
+
+    async def _attempt_async(self, session, endpoint, path, params, headers, timeout, priority):
+        try:
+            response = await session.get(endpoint.url + path, params=params, headers=headers,
+                                         timeout=timeout, priority=priority)
+        except requests.RequestException:
+            endpoint.record_failure()
+            raise
+        return self._check(endpoint, response)
+
+    def _check(self, endpoint, response):
+        if _is_endpoint_failure(response):
+            endpoint.record_failure()
+            raise requests.HTTPError(f"{endpoint.url}: HTTP {response.status_code}", response=response)
+        # Round trip only: time spent queued for a rate limit token is not
+        # the endpoint's latency and must not trigger hedges
+        endpoint.record_success(time.monotonic() - response.sent_at)
+        return response
+
+    def get(self, path='', params=None, headers=None, timeout=None):
+        """
+        GET `path` (appended to the endpoint URL). Returns the first good
+        requests.Response; raises the last requests.RequestException if
+        every endpoint failed, or JobCancelled if the calling job was.
+        """
+        candidates = self.ordered()
+        priority, token = current_priority(), current_token()
+        if len(candidates) == 1 or not self.hedge:
+            return self._failover(candidates, path, params, headers, timeout, priority, token)
+
+        executor = _get_executor()
+        pending = {}
+        remaining = list(candidates)
+        last_error = None
+
+        def launch():
+            endpoint = remaining.pop(0)
+            future = executor.submit(self._attempt, endpoint, path, params, headers,
+                                     timeout, priority, token)
+            pending[future] = endpoint
+
+        launch()
+        while pending:
+            primary = next(iter(pending.values()))
+            # Wait for the primary up to its p95; after that a hedge goes out
+            delay = primary.hedge_delay() if remaining and len(pending) == 1 else None
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                self.hedges += 1
+                launch()
+                continue
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except JobCancelled:
+                    raise
+                except requests.RequestException as e:
+                    last_error = e
+            if not pending and remaining:
+                # Failover: every request in flight failed
+                launch()
+        raise last_error
+
+    async def get_async(self, session, path='', params=None, headers=None, timeout=None,
+                        priority=None):
+        """
+        get for coroutines, sending through an async_http.AsyncSession.
+        Same endpoint order, hedging and failover; a hedge that loses the
+        race is cancelled instead of left to finish.
+        """
+        priority = current_priority() if priority is None else priority
+        pending = {}
+        remaining = list(self.ordered())
+        last_error = None
+
+        def launch():
+            endpoint = remaining.pop(0)
+            task = asyncio.ensure_future(self._attempt_async(session, endpoint, path, params,
+                                                             headers, timeout, priority))
+            pending[task] = endpoint
+
+        launch()
+        try:
+            while pending:
+                primary = next(iter(pending.values()))
+                hedge = self.hedge and remaining and len(pending) == 1
+                done, _ = await asyncio.wait(pending, timeout=primary.hedge_delay() if hedge else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    try:
+                        return task.result()
+                    except requests.RequestException as e:
+                        last_error = e
+                if not pending and remaining:
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _failover(self, candidates, path, params, headers, timeout, priority, token):
+        last_error = None
+        for endpoint in candidates:
+            try:
+                return self._attempt(endpoint, path, params, headers, timeout, priority, token)
+            except requests.RequestException as e:
+                last_error = e
+        raise last_error
+
+    def stats(self):
+        return {'hedges': self.hedges, 'endpoints': [e.stats() for e in self.endpoints]}
+
+
+def _env_urls(name):
+    value = os.environ.get(f"CHEAPMAPS_{name.upper()}_URLS")
+    if not value:
+        return None
+    return [url.strip() for url in value.split(',') if url.strip()]
+
+
+def load_config(path=None):
+    """
+    Endpoint lists per service: defaults, then backends.json, then env vars.
+    """
+    config = {name: list(urls) for name, urls in DEFAULT_BACKENDS.items()}
+    path = path or get_data_path('backends.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            for name, urls in json.load(f).items():
+                config[name] = [urls] if isinstance(urls, str) else list(urls)
+    for name in config:
+        urls = _env_urls(name)
+        if urls:
+            config[name] = urls
+    return config
+
+
+class BackendRegistry:
+    def __init__(self, config=None):
+        self.lock = threading.Lock()
+        self.services = {}
+        self.configure(config or load_config())
+
+    def configure(self, config):
+        """
+        Replaces the endpoints of the services in `config` ({name: [urls]}).
+        """
+        with self.lock:
+            for name, urls in config.items():
+                self.services[name] = Service(name, urls)
+
+    def service(self, name):
+        with self.lock:
+            return self.services[name]
+
+    def stats(self):
+        with self.lock:
+            services = dict(self.services)
+        return {name: service.stats() for name, service in services.items()}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _registry_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS,
+                                               thread_name_prefix="cheapmaps-backend")
+    return _executor
+
+
+def get_backends():
+    """
+    Returns the process-wide backend registry.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = BackendRegistry()
+    return _registry
+
+
+def get_service(name):
+    return get_backends().service(name)
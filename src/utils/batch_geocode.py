@@ -0,0 +1,205 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from src.utils import http_client
+from src.utils.geocoder import Geocoder
+from src.utils.job_scheduler import PRIORITY_BACKGROUND, job_context
+
+# Lookups run concurrently but Nominatim itself is paced by the HTTP rate
+# limiter, so extra workers mainly overlap cache hits and network latency.
+DEFAULT_WORKERS = 4
+# Rows handed to the pool ahead of the writer (bounds memory on huge files)
+WINDOW_PER_WORKER = 8
+CHECKPOINT_EVERY = 50
+
+RESULT_FIELDS = ['lat', 'lon', 'display_name', 'status', 'source']
+
+
+def read_rows(path, column):
+    """
+    Yields (record, query) from a CSV (query taken from `column`, or the
+    first column) or a JSONL file (query taken from the `column` field).
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            field = column if column in (reader.fieldnames or []) else (reader.fieldnames or [None])[0]
+            for record in reader:
+                yield record, (record.get(field) or '').strip()
+        else:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record, str(record.get(column) or '').strip()
+
+
+def _geocode(geocoder, query):
+    if not query:
+        return None, None, 'empty'
+    try:
+        with job_context(PRIORITY_BACKGROUND):
+            result, source = geocoder.lookup(query)
+    except requests.RequestException as e:
+        print(f"Batch geocoding error for {query!r}: {e}")
+        return None, None, 'error'
+    return result, source, 'ok' if result else 'not_found'
+
+
+class BatchGeocoder:
+    """
+    Geocodes a CSV/JSONL address list into an output file (CSV or JSONL,
+    by extension), writing rows in input order as they complete.
+
+    Progress is checkpointed next to the output as `<output>.checkpoint`
+    (rows done and the output size at that point), so an interrupted run
+    resumes where it stopped; output written after the last checkpoint is
+    truncated and redone. The checkpoint never moves past a row whose
+    lookup failed ('error'), so rerunning retries it (and the rows after
+    it, mostly from the cache) instead of keeping the failure.
+    """
+
+    def __init__(self, geocoder=None, workers=DEFAULT_WORKERS, column='address',
+                 checkpoint_every=CHECKPOINT_EVERY):
+        self.geocoder = geocoder or Geocoder()
+        self.workers = max(1, workers)
+        self.column = column
+        self.checkpoint_every = checkpoint_every
+
+    def _load_checkpoint(self, input_path, checkpoint_path, output_path):
+        if not os.path.exists(checkpoint_path) or not os.path.exists(output_path):
+            return 0, 0
+        with open(checkpoint_path) as f:
+            state = json.load(f)
+        if state.get('input') != os.path.abspath(input_path):
+            raise ValueError(f"{checkpoint_path} belongs to another input: {state.get('input')}")
+        return state['rows_done'], state['output_bytes']
+
+    def _save_checkpoint(self, input_path, checkpoint_path, output, rows_done, output_bytes):
+        output.flush()
+        os.fsync(output.fileno())
+        tmp = checkpoint_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'input': os.path.abspath(input_path), 'rows_done': rows_done,
+                       'output_bytes': output_bytes}, f)
+        os.replace(tmp, checkpoint_path)
+
+    def run(self, input_path, output_path):
+        """
+        Returns a report dict (rows, statuses, sources, throughput, cache hit rate).
+        """
+        checkpoint_path = output_path + '.checkpoint'
+        rows_done, output_bytes = self._load_checkpoint(input_path, checkpoint_path, output_path)
+        as_csv = output_path.lower().endswith('.csv')
+
+        output = open(output_path, 'r+' if rows_done else 'w', encoding='utf-8', newline='')
+        output.seek(output_bytes)
+        output.truncate()
+        writer = None
+
+        statuses, sources = Counter(), Counter()
+        processed = 0
+        start = time.perf_counter()
+        rows = enumerate(read_rows(input_path, self.column))
+        pending, ready = {}, {}
+        next_row = rows_done
+        # (row, output offset) of the first failed lookup; checkpoints stop there
+        retry_from = None
+        window = self.workers * WINDOW_PER_WORKER
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) + len(ready) < window:
+                    item = next(rows, None)
+                    if item is None:
+                        exhausted = True
+                    elif item[0] >= rows_done:
+                        index, (record, query) = item
+                        pending[executor.submit(_geocode, self.geocoder, query)] = (index, record)
+                if not pending and not ready:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, record = pending.pop(future)
+                    ready[index] = (record, future.result())
+
+                while next_row in ready:
+                    record, (result, source, status) = ready.pop(next_row)
+                    if status == 'error' and retry_from is None:
+                        output.flush()
+                        retry_from = (next_row, output.tell())
+                    out = dict(record, status=status, source=source,
+                               lat=result['lat'] if result else None,
+                               lon=result['lon'] if result else None,
+                               display_name=result['display_name'] if result else None)
+                    if as_csv:
+                        if writer is None:
+                            fields = list(record) + [f for f in RESULT_FIELDS if f not in record]
+                            writer = csv.DictWriter(output, fieldnames=fields, extrasaction='ignore')
+                            if next_row == 0:
+                                writer.writeheader()
+                        writer.writerow(out)
+                    else:
+                        output.write(json.dumps(out, ensure_ascii=False) + '\n')
+                    statuses[status] += 1
+                    sources[source or 'none'] += 1
+                    processed += 1
+                    next_row += 1
+                    if processed % self.checkpoint_every == 0:
+                        self._save_checkpoint(input_path, checkpoint_path, output,
+                                              *(retry_from or (next_row, output.tell())))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._save_checkpoint(input_path, checkpoint_path, output,
+                                  *(retry_from or (next_row, output.tell())))
+            output.close()
+
+        elapsed = time.perf_counter() - start
+        looked_up = sum(sources[s] for s in ('local', 'cache', 'remote'))
+        return {
+            'rows': next_row,
+            'processed': processed,
+            'resumed_from': rows_done,
+            'retry_from': retry_from[0] if retry_from else None,
+            'statuses': dict(statuses),
+            'sources': dict(sources),
+            'elapsed_s': elapsed,
+            'rows_per_s': processed / elapsed if elapsed > 0 else 0.0,
+            'cache_hit_rate': (sources['local'] + sources['cache']) / looked_up if looked_up else 0.0,
+            'rate_limit': http_client.limiter_stats()
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.utils.batch_geocode",
+                                     description="Geocode a CSV/JSONL address list")
+    parser.add_argument("input", help=".csv or .jsonl file of addresses")
+    parser.add_argument("output", help=".csv or .jsonl results (resumed if a checkpoint exists)")
+    parser.add_argument("--column", default="address",
+                        help="CSV column / JSON field holding the address (default: address)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--offline", action="store_true",
+                        help="only use the local place index and cache")
+    args = parser.parse_args(argv)
+
+    batch = BatchGeocoder(Geocoder(offline=args.offline), workers=args.workers, column=args.column)
+    try:
+        report = batch.run(args.input, args.output)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume.")
+        return 130
+    print(json.dumps(report, indent=2))
+    if report['retry_from'] is not None:
+        print(f"Some lookups failed; rerun the same command to retry from row {report['retry_from']}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from src.utils.resource_path import get_data_path
+
+DEFAULT_TTL = 30 * 24 * 3600      # geocoding answers rarely change
+DEFAULT_MAX_ENTRIES = 50000
+MEMORY_ENTRIES = 2048             # hot entries kept in-process
+TOUCH_INTERVAL = 3600             # only rewrite last-access once per hour
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """
+    Normalizes a free-text query so 'Bucharest ', 'bucharest' and 'BUCHAREST,'
+    share a cache entry.
+    """
+    query = _WHITESPACE.sub(" ", str(query)).strip().lower()
+    return query.strip(" ,.;")
+
+
+def coord_key(lat, lon, precision=5):
+    """
+    Cache key for a coordinate (5 decimals is roughly one metre).
+    """
+    return f"{lat:.{precision}f},{lon:.{precision}f}"
+
+
+class GeoCache:
+    """
+    SQLite backed key/value cache for geocoding results, shared by forward
+    search, autocomplete and reverse lookups ('kind' keeps them apart).
+    Entries expire after `ttl` seconds and the least recently used ones are
+    evicted once the table grows beyond `max_entries`.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 memory_entries=MEMORY_ENTRIES):
+        self.path = path or get_data_path('geocache.sqlite')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)")
+        self.conn.commit()
+
+    def get(self, kind, key):
+        """
+        Returns the cached value or None if missing/expired.
+        """
+        mkey = (kind, key)
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(mkey)
+            if entry is not None:
+                value, created, accessed = entry
+                if now - created < self.ttl:
+                    self.memory.move_to_end(mkey)
+                    self._touch(mkey, entry, now)
+                    self.hits += 1
+                    return value
+                del self.memory[mkey]
+
+            row = self.conn.execute(
+                "SELECT value, created, accessed FROM entries WHERE kind = ? AND key = ?",
+                mkey).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created, accessed = json.loads(row[0]), row[1], row[2]
+            if now - created >= self.ttl:
+                self.conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", mkey)
+                self.conn.commit()
+                self.misses += 1
+                return None
+
+            entry = (value, created, accessed)
+            self._remember(mkey, entry)
+            self._touch(mkey, entry, now)
+            self.hits += 1
+            return value
+
+    def set(self, kind, key, value):
+        mkey = (kind, key)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (kind, key, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(value), now, now))
+            self._remember(mkey, (value, now, now))
+            self._evict()
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.conn.execute("DELETE FROM entries")
+            self.conn.commit()
+
+    def _remember(self, mkey, entry):
+        self.memory[mkey] = entry
+        self.memory.move_to_end(mkey)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _touch(self, mkey, entry, now):
+        # LRU bookkeeping is coarse on purpose: a write per read would cost more
+        # than the lookup itself.
+        value, created, accessed = entry
+        if now - accessed < TOUCH_INTERVAL:
+            return
+        self.memory[mkey] = (value, created, now)
+        self.conn.execute("UPDATE entries SET accessed = ? WHERE kind = ? AND key = ?",
+                          (now, mkey[0], mkey[1]))
+        self.conn.commit()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Trim to 90% so eviction does not run on every insert
+        excess = count - int(self.max_entries * 0.9)
+        self.conn.execute("""
+            DELETE FROM entries WHERE rowid IN (
+                SELECT rowid FROM entries ORDER BY accessed ASC LIMIT ?
+            )
+        """, (excess,))
+        self.conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+        for mkey in list(self.memory):
+            if self.conn.execute("SELECT 1 FROM entries WHERE kind = ? AND key = ?", mkey).fetchone() is None:
+                del self.memory[mkey]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_geo_cache():
+    """
+    Returns the process-wide geocoding cache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GeoCache()
+    return _cache
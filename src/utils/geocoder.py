@@ -1,77 +1,402 @@
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from src.utils.backends import get_service
+from src.utils.job_scheduler import current_priority, current_token, job_context
+from src.utils.geo_cache import get_geo_cache, normalize_query, coord_key
+from src.utils.geometry import build_lods, to_array
+from src.utils import polyline
+from src.utils.route_cache import get_route_cache, route_key
+from src.utils.route_legs import leg_key, split_route, stitch_legs
+from src.utils.route_matrix import RouteMatrix
+from src.utils.offline_router import get_offline_router
+from src.utils.place_index import get_place_index
+
+# Waypoints per OSRM route request; longer stop lists are routed in
+# overlapping chunks (URL length and the server's coordinate limit)
+MAX_CHUNK_WAYPOINTS = 50
+# Chunks of one route requested at the same time
+ROUTE_CONCURRENCY = 6
+
+def merge_suggestions(local, remote, limit):
+    """
+    Local matches first, then remote ones not already listed.
+    """
+    merged = list(local)
+    for name in remote:
+        if name not in merged:
+            merged.append(name)
+    return merged[:limit]
+
+def parse_search(data):
+    """
+    First hit of a Nominatim /search response, or None.
+    """
+    if not data:
+        return None
+    return {
+        'lat': float(data[0]['lat']),
+        'lon': float(data[0]['lon']),
+        'display_name': data[0]['display_name']
+    }
+
+def parse_location(data):
+    """
+    An ip-api /json response as a location, or None if the lookup failed.
+    """
+    if data.get('status') != 'success':
+        return None
+    return {
+        'lat': float(data['lat']),
+        'lon': float(data['lon']),
+        'display_name': f"{data.get('city', 'Unknown')}, {data.get('country', 'Location')}"
+    }
+
+def parse_routes(data, geometries):
+    """
+    The routes of an OSRM route response as [{'coordinates', 'distance',
+    'duration', 'summary'}]; empty if OSRM found none.
+    """
+    routes = []
+    if data.get('code') == 'Ok':
+        for route in data.get('routes', []):
+            if geometries == 'geojson':
+                # GeoJSON is [lon, lat]; flip to Leaflet's [lat, lon]
+                coords = to_array(route['geometry']['coordinates'])[:, ::-1].copy()
+            else:
+                precision = 5 if geometries == 'polyline' else 6
+                coords = polyline.decode(route['geometry'], precision)
+            routes.append({'coordinates': coords, 'distance': route['distance'],
+                           'duration': route['duration'],
+                           'summary': route.get('weight_name', 'Route')})
+    return routes
 
 class Geocoder:
-    def __init__(self):
-        self.base_url = "https://nominatim.openstreetmap.org/search"
-        self.headers = {
-            'User-Agent': 'ProiectLogis_MapApp/1.0'
-        }
+    def __init__(self, offline=False):
+        # Endpoints come from the backend registry (see src.utils.backends)
+        self.nominatim = get_service('nominatim')
+        self.osrm = get_service('osrm')
+        self.ip_api = get_service('ip_api')
+        self.cache = get_geo_cache()
+        self.route_cache = get_route_cache()
+        self.profile = 'driving'
+        # Local place index (if one was built) is asked first; offline=True
+        # never falls back to Nominatim.
+        self.place_index = get_place_index()
+        # Local road graph (if one was built) answers driving routes without OSRM
+        self.local_router = get_offline_router()
+        self.offline = offline
 
     def search(self, query):
         """
         Search for a location string.
         Returns a dictionary with lat, lon, and display_name if found, else None.
         """
-        params = {
+        try:
+            return self.lookup(query)[0]
+        except requests.RequestException as e:
+            print(f"Geocoding error: {e}")
+            return None
+
+    def lookup(self, query):
+        """
+        Like search, but returns (result, source) where source is 'local',
+        'cache' or 'remote' (None when offline and nothing matched), and lets
+        requests.RequestException through so callers can tell a failed
+        request from "not found".
+        """
+        known = self._known_lookup(query)
+        if known is not None:
+            return known
+
+        response = self.nominatim.get('/search', params=self._search_params(query))
+        response.raise_for_status()
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise requests.RequestException(f"Invalid response: {e}")
+        return self._store_lookup(query, parse_search(data))
+
+    def _known_lookup(self, query):
+        # (result, source) if answered without the network, else None
+        if self.place_index is not None:
+            # A full search only takes a local place that matches the whole
+            # query; prefix matches are for suggest
+            local = self.place_index.find(query, limit=1)
+            if local:
+                return local[0], 'local'
+
+        cached = self.cache.get('search', normalize_query(query))
+        if cached is not None:
+            return cached, 'cache'
+        if self.offline:
+            return None, None
+        return None
+
+    def _search_params(self, query):
+        return {
             'q': query,
             'format': 'json',
             'limit': 1
         }
-        
+
+    def _store_lookup(self, query, result):
+        if result:
+            self.cache.set('search', normalize_query(query), result)
+        return result, 'remote'
+
+    def suggest(self, query, limit=5):
+        """
+        Autocomplete suggestions (display names) for a partial query.
+        Local index matches come first, topped up from Nominatim.
+        Returns a list, or None if the request failed.
+        """
+        local = self.local_suggest(query, limit)
+        if len(local) >= limit or self.offline:
+            return local
+
+        key = normalize_query(query)
+        cached = self.cache.get('suggest', key)
+        if cached is not None:
+            return merge_suggestions(local, cached, limit)
+
+        params = {
+            'q': query,
+            'format': 'json',
+            'addressdetails': 1,
+            'limit': limit
+        }
         try:
-            response = requests.get(self.base_url, params=params, headers=self.headers)
+            response = self.nominatim.get('/search', params=params, timeout=3)
             response.raise_for_status()
-            data = response.json()
-            
-            if data:
-                return {
-                    'lat': float(data[0]['lat']),
-                    'lon': float(data[0]['lon']),
-                    'display_name': data[0]['display_name']
-                }
-            return None
-            
-            
-        except requests.RequestException as e:
-            print(f"Geocoding error: {e}")
+            suggestions = [item['display_name'] for item in response.json()]
+            self.cache.set('suggest', key, suggestions)
+            return merge_suggestions(local, suggestions, limit)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Worker Error: {e}")
+            return local or None
+
+    def local_suggest(self, query, limit=5):
+        """
+        Suggestions from the local place index only (no network, a few ms).
+        """
+        if self.place_index is None:
+            return []
+        return self.place_index.suggest(query, limit)
+
+
+    def reverse(self, lat, lon):
+        """
+        Returns the display name for a coordinate, or None if it can't be resolved.
+        """
+        key = coord_key(lat, lon)
+        cached = self.cache.get('reverse', key)
+        if cached is not None:
+            return cached
+
+        params = {
+            'lat': lat,
+            'lon': lon,
+            'format': 'json'
+        }
+        try:
+            response = self.nominatim.get('/reverse', params=params, timeout=3)
+            response.raise_for_status()
+            name = response.json().get('display_name')
+            if name:
+                self.cache.set('reverse', key, name)
+            return name
+        except (requests.RequestException, ValueError) as e:
+            print(f"Reverse Geo Error: {e}")
             return None
 
-    def get_route(self, coordinates_list):
+    def resolve(self, location_txt):
+        """
+        Resolves a waypoint entry, treating "My Location" as the IP based position.
+        """
+        if location_txt.strip().lower() == "my location":
+            return self.get_current_location()
+        return self.search(location_txt)
+
+    def get_route(self, coordinates_list, geometries='polyline6'):
+        """
+        Routes through the given (lat, lon) points, on the local road graph
+        when one was built (see src.utils.road_graph), otherwise with OSRM.
+        Each route's 'coordinates' is an (N, 2) float array of [lat, lon];
+        'lods' holds polyline6-encoded simplified copies for the map.
+        geometries='geojson' is still accepted for servers without polyline6.
+        """
         if len(coordinates_list) < 2:
             return None
+
+        if self.local_router is not None and self.profile == 'driving':
+            routes = self._get_local_route(coordinates_list)
+            if routes is not None or self.offline:
+                return routes
+        elif self.offline:
+            return None
             
-        coords_str = ";".join([f"{lon},{lat}" for lat, lon in coordinates_list])
+        key = self._route_cache_key(coordinates_list, geometries)
+        cached = self.route_cache.get(key)
+        if cached is not None:
+            return cached
         
-        url = f"http://router.project-osrm.org/route/v1/driving/{coords_str}"
+        try:
+            if len(coordinates_list) > 2:
+                routes = self._get_leg_route(coordinates_list, geometries)
+            else:
+                routes, _ = self._request_routes(coordinates_list, geometries, alternatives=True)
+        except requests.RequestException as e:
+            print(f"Routing error: {e}")
+            return None
+        return self._cache_routes(key, routes)
+
+    def _route_cache_key(self, coordinates_list, geometries):
         params = {
             'overview': 'full',
-            'geometries': 'geojson',
+            'geometries': geometries,
             'alternatives': 'true' # Request multiple routes
         }
-        
+        return route_key(self.profile, coordinates_list, params)
+
+    def _cache_routes(self, key, routes):
+        # Adds the map LODs and caches; None if there was no route
+        if not routes:
+            return None
+        parsed_routes = [self._route_entry(route['coordinates'], route['distance'], route['duration'],
+                                           route['summary']) for route in routes]
+        self.route_cache.set(key, parsed_routes)
+        return list(parsed_routes)
+
+    def _route_request(self, coordinates_list, geometries, alternatives=False):
+        # (path, params) of an OSRM route request
+        coords_str = ";".join([f"{lon},{lat}" for lat, lon in coordinates_list])
+        params = {
+            'overview': 'full',
+            'geometries': geometries,
+            'alternatives': 'true' if alternatives else 'false'
+        }
+        return f"/route/v1/{self.profile}/{coords_str}", params
+
+    def _request_routes(self, coordinates_list, geometries, alternatives=False):
+        """
+        One OSRM route request. Returns (routes, data): routes as
+        [{'coordinates', 'distance', 'duration', 'summary'}] (empty if OSRM
+        found none) and the decoded response. Raises requests.RequestException.
+        """
+        path, params = self._route_request(coordinates_list, geometries, alternatives)
+        response = self.osrm.get(path, params=params)
+        response.raise_for_status()
         try:
-            response = requests.get(url, params=params, headers=self.headers)
-            response.raise_for_status()
             data = response.json()
-            
-            if data.get('code') == 'Ok' and data.get('routes'):
-                parsed_routes = []
-                
-                for route in data['routes']:
-                    geometry = route['geometry']['coordinates']
-                    leaflet_coords = [[coord[1], coord[0]] for coord in geometry]
-                    
-                    parsed_routes.append({
-                        'coordinates': leaflet_coords,
-                        'distance': route['distance'],
-                        'duration': route['duration'],
-                        'summary': route.get('weight_name', 'Route')
-                    })
-                
-                return parsed_routes
+        except ValueError as e:
+            raise requests.RequestException(f"Invalid route response: {e}")
+        return parse_routes(data, geometries), data
+
+    def _get_leg_route(self, coordinates_list, geometries):
+        """
+        Multi-stop route assembled from per-leg cache entries, so editing,
+        reordering or deleting a stop only requests the legs that changed.
+
+        Consecutive missing legs are fetched together as one request per
+        chunk of at most MAX_CHUNK_WAYPOINTS points; neighbouring chunks
+        share their boundary stop, and all chunks run concurrently, so a
+        route with hundreds of stops takes about as long as one chunk.
+        """
+        keys, legs, chunks = self._plan_legs(coordinates_list)
+        priority, token = current_priority(), current_token()
+
+        def fetch(chunk):
+            first, last = chunk
+            with job_context(priority, token):
+                routes, data = self._request_routes(coordinates_list[first:last + 1], geometries)
+            return self._store_legs(keys[first:last], routes, data)
+
+        if not chunks:
+            # Every leg is cached, e.g. after deleting the first or last stop
+            results = []
+        elif len(chunks) == 1:
+            results = [fetch(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(ROUTE_CONCURRENCY, len(chunks))) as executor:
+                results = list(executor.map(fetch, chunks))
+        return self._join_legs(legs, chunks, results)
+
+    def _plan_legs(self, coordinates_list):
+        """
+        Cache keys and cached legs (None where missing) of a multi-stop
+        route, and the (first, last) point ranges of the chunks to request.
+        """
+        pairs = list(zip(coordinates_list[:-1], coordinates_list[1:]))
+        keys = [leg_key(self.profile, a, b) for a, b in pairs]
+        legs = [self.route_cache.get(key) for key in keys]
+        legs = [cached[0] if cached else None for cached in legs]
+
+        chunks = []
+        i = 0
+        while i < len(legs):
+            if legs[i] is not None:
+                i += 1
+                continue
+            end = i
+            while end + 1 < len(legs) and legs[end + 1] is None and end + 1 - i < MAX_CHUNK_WAYPOINTS - 1:
+                end += 1
+            chunks.append((i, end + 1))  # legs i..end, points i..end + 1
+            i = end + 1
+        return keys, legs, chunks
+
+    def _store_legs(self, keys, routes, data):
+        # Splits a chunk's route into its legs and caches each under its key
+        if not routes:
             return None
+        route = routes[0]
+        osrm_legs = data['routes'][0]['legs']
+        if len(osrm_legs) == 1:
+            pieces = [route['coordinates']]
+        else:
+            waypoints = [(wp['location'][1], wp['location'][0]) for wp in data['waypoints']]
+            pieces = split_route(route['coordinates'], waypoints, [leg['distance'] for leg in osrm_legs])
+        fetched = []
+        for key, piece, leg in zip(keys, pieces, osrm_legs):
+            leg = {'coordinates': piece, 'distance': leg['distance'],
+                   'duration': leg['duration'], 'summary': route['summary']}
+            self.route_cache.set(key, [leg])
+            fetched.append(leg)
+        return fetched
+
+    def _join_legs(self, legs, chunks, results):
+        for (first, last), fetched in zip(chunks, results):
+            if fetched is None:
+                return None
+            legs[first:last] = fetched
+        return [stitch_legs(legs, legs[0].get('summary', 'Route'))]
+
+    def _route_entry(self, coords, distance, duration, summary):
+        return {
+            'coordinates': coords,
+            'lods': [{'maxZoom': zoom, 'polyline': polyline.encode(level)}
+                     for zoom, level in build_lods(coords)],
+            'distance': distance,
+            'duration': duration,
+            'summary': summary
+        }
+
+    def _get_local_route(self, coordinates_list):
+        # Falls back to OSRM (returns None) when a point lies off the local graph
+        key = route_key('local-' + self.profile, coordinates_list)
+        cached = self.route_cache.get(key)
+        if cached is not None:
+            return cached
+        return self._cache_routes(key, self.local_router.route(coordinates_list))
+
+    def get_matrix(self, sources, destinations=None):
+        """
+        Duration/distance matrix between (lat, lon) points via OSRM's table
+        service; see RouteMatrix.table. Returns None if a request fails.
+        """
+        try:
+            return RouteMatrix(self.osrm, self.profile).table(sources, destinations)
         except requests.RequestException as e:
-            print(f"Routing error: {e}")
+            print(f"Matrix error: {e}")
             return None
 
     def get_current_location(self):
@@ -79,17 +404,9 @@ class Geocoder:
         Get current location based on IP address.
         """
         try:
-            response = requests.get('http://ip-api.com/json')
+            response = self.ip_api.get('/json')
             response.raise_for_status()
-            data = response.json()
-            
-            if data['status'] == 'success':
-                return {
-                    'lat': float(data['lat']),
-                    'lon': float(data['lon']),
-                    'display_name': f"{data.get('city', 'Unknown')}, {data.get('country', 'Location')}"
-                }
-            return None
+            return parse_location(response.json())
         except Exception as e:
             print(f"Location error: {e}")
             return None
@@ -0,0 +1,124 @@
+import numpy as np
+
+# Zoom levels that get their own simplified copy of a route. A route drawn at
+# zoom z uses the first level whose max zoom is >= z; the last level is used
+# for everything above it.
+LOD_ZOOMS = (5, 8, 11, 14, 17)
+
+# Allowed deviation in screen pixels at the level's max zoom
+LOD_PIXEL_TOLERANCE = 1.0
+
+TILE_SIZE = 256
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def to_array(coordinates):
+    """
+    Returns an (N, 2) float64 array of [lat, lon] pairs.
+    """
+    return np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in metres; works on scalars and NumPy arrays.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def project_mercator(coords):
+    """
+    Projects [lat, lon] pairs to normalized Web Mercator x/y in [0, 1],
+    the space Leaflet renders in (multiply by 256 * 2**zoom for pixels).
+    """
+    lat = np.clip(coords[:, 0], -85.05112878, 85.05112878)
+    x = (coords[:, 1] + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return np.column_stack((x, y))
+
+
+def simplify_mask(points, tolerance):
+    """
+    Douglas-Peucker over an (N, 2) array of planar points.
+    Returns a boolean mask of the points to keep; the first and last are always kept.
+    All open segments of one recursion depth are split in a single vectorized pass,
+    so the Python loop runs once per depth rather than once per segment.
+    """
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+
+    tol_sq = tolerance * tolerance
+    starts = np.array([0])
+    ends = np.array([n - 1])
+    while len(starts):
+        counts = ends - starts - 1
+        open_segments = counts > 0
+        starts, ends, counts = starts[open_segments], ends[open_segments], counts[open_segments]
+        if not len(starts):
+            break
+
+        # Flatten the interior points of every segment into one array
+        seg_id = np.repeat(np.arange(len(starts)), counts)
+        offsets = np.cumsum(counts) - counts
+        flat = np.arange(counts.sum()) - offsets[seg_id] + starts[seg_id] + 1
+
+        a = points[starts][seg_id]
+        seg = points[ends][seg_id] - a
+        rel = points[flat] - a
+        seg_len_sq = np.einsum('ij,ij->i', seg, seg)
+
+        # Distance to the segment (not the infinite line), so spikes are kept
+        t = np.einsum('ij,ij->i', rel, seg) / np.where(seg_len_sq > 0, seg_len_sq, 1.0)
+        t = np.clip(t, 0.0, 1.0)
+        diff = rel - t[:, None] * seg
+        dist_sq = np.einsum('ij,ij->i', diff, diff)
+
+        max_sq = np.maximum.reduceat(dist_sq, offsets)
+        # First interior point reaching its segment's maximum
+        at_max = np.flatnonzero(dist_sq == max_sq[seg_id])
+        _, first = np.unique(seg_id[at_max], return_index=True)
+        split = flat[at_max[first]]
+
+        over = max_sq > tol_sq
+        split = split[over]
+        keep[split] = True
+        starts, ends = (np.concatenate((starts[over], split)),
+                        np.concatenate((split, ends[over])))
+    return keep
+
+
+def simplify(coordinates, tolerance_px, zoom):
+    """
+    Simplifies a [lat, lon] polyline so it deviates at most `tolerance_px`
+    screen pixels when drawn at `zoom`.
+    """
+    coords = to_array(coordinates)
+    tolerance = tolerance_px / (TILE_SIZE * (2 ** zoom))
+    return coords[simplify_mask(project_mercator(coords), tolerance)]
+
+
+def build_lods(coordinates, zooms=LOD_ZOOMS, tolerance_px=LOD_PIXEL_TOLERANCE):
+    """
+    Returns [(max_zoom, coords), ...] from coarsest to finest.
+    Each coarser level is simplified from the finer level's output, which
+    keeps the total cost close to a single pass over the full geometry.
+    """
+    coords = to_array(coordinates)
+    projected = project_mercator(coords)
+    levels = []
+    index = np.arange(len(coords))
+    for zoom in sorted(zooms, reverse=True):
+        tolerance = tolerance_px / (TILE_SIZE * (2 ** zoom))
+        mask = simplify_mask(projected[index], tolerance)
+        index = index[mask]
+        levels.append((zoom, coords[index]))
+    levels.reverse()
+    return levels
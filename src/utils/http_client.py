@@ -0,0 +1,154 @@
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from src.utils.job_scheduler import JobCancelled, current_priority, current_token
+from src.utils.rate_limit import RateLimiterRegistry
+
+USER_AGENT = 'ProiectLogis_MapApp/1.0'
+
+# (connect, read) in seconds, used when a caller does not pass its own timeout
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Keep-alive pool sizing: one pool per host, enough connections for the worker threads
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+_limiters = RateLimiterRegistry()
+
+# Identical GETs in flight share one network request
+_inflight = {}
+_inflight_lock = threading.Lock()
+_coalesced = 0
+
+
+class _InflightRequest:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+def _build_session():
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive'
+    })
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                          pool_maxsize=POOL_MAXSIZE,
+                          max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Returns the process-wide requests.Session.
+    Connections are kept alive and reused per host, so only the first request
+    to nominatim/OSRM/open-meteo pays the TCP+TLS handshake.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _request_key(url, params, headers):
+    def frozen(mapping):
+        return tuple(sorted((str(k), str(v)) for k, v in (mapping or {}).items()))
+    return url, frozen(params), frozen(headers)
+
+
+def get(url, params=None, headers=None, timeout=None, priority=None):
+    """
+    GET through the shared session with the central User-Agent and timeout.
+
+    Requests to rate limited hosts (see rate_limit.HOST_LIMITS) wait for a
+    token; `priority` defaults to that of the job running on this thread, so
+    interactive lookups are sent before queued background ones. A request
+    identical to one already in flight waits for and shares its response.
+    The response's `sent_at` is the time.monotonic() at which it left the
+    queue, so callers can time the round trip without the rate limit wait.
+    Raises requests.RequestException like requests.get does, and
+    JobCancelled if the calling job is cancelled while queued.
+    """
+    global _coalesced
+    key = _request_key(url, params, headers)
+    while True:
+        with _inflight_lock:
+            pending = _inflight.get(key)
+            if pending is None:
+                pending = _inflight[key] = _InflightRequest()
+                break
+            _coalesced += 1
+        pending.done.wait()
+        if isinstance(pending.error, JobCancelled):
+            # The owner's job was cancelled while queued, not ours: try again
+            continue
+        if pending.error is not None:
+            raise pending.error
+        return pending.response
+
+    try:
+        limiter = _limiters.get(urlsplit(url).hostname)
+        if limiter is not None:
+            limiter.acquire(current_priority() if priority is None else priority,
+                            current_token())
+        sent_at = time.monotonic()
+        response = get_session().get(url, params=params, headers=headers,
+                                     timeout=timeout or DEFAULT_TIMEOUT)
+        response.sent_at = sent_at
+        pending.response = response
+        return response
+    except BaseException as e:
+        pending.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        pending.done.set()
+
+
+def get_rate_limiter(host):
+    """
+    The limiter shared by every request to `host`, or None if it is unlimited.
+    """
+    return _limiters.get(host)
+
+
+def set_rate_limit(host, rate, burst=1):
+    """
+    Overrides the requests/second limit for a host (e.g. a self-hosted Nominatim).
+    """
+    _limiters.set_limit(host, rate, burst)
+
+
+def limiter_stats():
+    """
+    Queue wait statistics per rate limited host, plus the number of
+    requests answered by coalescing onto an identical in-flight one.
+    """
+    with _inflight_lock:
+        coalesced = _coalesced
+    return {'hosts': _limiters.stats(), 'coalesced': coalesced}
+
+
+def close():
+    """
+    Drops all pooled connections (e.g. on application exit).
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,234 @@
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+
+# Lower value runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BACKGROUND = 10
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """
+    Shared flag between whoever submitted a job and the job itself.
+    Long running jobs can poll `cancelled` (or call raise_if_cancelled) to stop early.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+_context = threading.local()
+
+
+def current_priority():
+    """
+    Priority of the job running on this thread (PRIORITY_NORMAL outside jobs).
+    Lets lower layers such as the HTTP rate limiter order work by the
+    priority it was submitted with.
+    """
+    return getattr(_context, 'priority', PRIORITY_NORMAL)
+
+
+def current_token():
+    """
+    CancelToken of the job running on this thread, or None.
+    """
+    return getattr(_context, 'token', None)
+
+
+@contextmanager
+def job_context(priority, token=None):
+    """
+    Runs a block as if it were a job of the given priority, e.g. on threads
+    not owned by the scheduler (batch workers).
+    """
+    previous = (getattr(_context, 'priority', PRIORITY_NORMAL), getattr(_context, 'token', None))
+    _context.priority, _context.token = priority, token
+    try:
+        yield
+    finally:
+        _context.priority, _context.token = previous
+
+
+class Job:
+    def __init__(self, fn, args, kwargs, priority, key, on_result, on_error):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.on_result = on_result
+        self.on_error = on_error
+        self.token = CancelToken()
+
+
+class JobScheduler:
+    """
+    Bounded pool of reusable worker threads fed from a priority queue.
+
+    - Jobs with the same `key` supersede each other: submitting a new one
+      cancels the previous (queued jobs are dropped, running ones have their
+      result discarded).
+    - One worker is reserved for interactive jobs so background prefetch
+      can never starve a search.
+    - `on_result`/`on_error` run on the worker thread; see
+      src.ui.job_runner for delivery onto the Qt thread.
+    """
+
+    def __init__(self, max_workers=4, name="cheapmaps-job"):
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self.heap = []
+        self.cond = threading.Condition()
+        self.counter = itertools.count()
+        self.keyed = {}
+        self.workers = []
+        self.running = 0
+        self.stopped = False
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'dropped': 0}
+
+    def submit(self, fn, *args, priority=PRIORITY_NORMAL, key=None,
+               on_result=None, on_error=None, pass_token=False, **kwargs):
+        """
+        Queues fn(*args, **kwargs) and returns the job's CancelToken.
+        With pass_token=True the token is passed as the `token` keyword.
+        """
+        job = Job(fn, args, kwargs, priority, key, on_result, on_error)
+        if pass_token:
+            job.kwargs['token'] = job.token
+
+        with self.cond:
+            if self.stopped:
+                raise RuntimeError("JobScheduler has been shut down")
+            if key is not None:
+                previous = self.keyed.get(key)
+                if previous is not None:
+                    previous.token.cancel()
+                self.keyed[key] = job
+            heapq.heappush(self.heap, (priority, next(self.counter), job))
+            self.stats['submitted'] += 1
+            self._ensure_workers()
+            self.cond.notify_all()
+        return job.token
+
+    def cancel(self, key):
+        with self.cond:
+            job = self.keyed.pop(key, None)
+        if job is not None:
+            job.token.cancel()
+
+    def pending(self):
+        with self.cond:
+            return sum(1 for _, _, job in self.heap if not job.token.cancelled)
+
+    def shutdown(self, wait=False):
+        with self.cond:
+            self.stopped = True
+            for _, _, job in self.heap:
+                job.token.cancel()
+            self.heap = []
+            self.cond.notify_all()
+        if wait:
+            for worker in self.workers:
+                worker.join()
+
+    def _ensure_workers(self):
+        # Called with the condition held. Threads are created on demand and
+        # reused: enough for every running and queued job, plus one so the
+        # interactive-only worker stays free for interactive jobs.
+        busy_or_queued = self.running + len(self.heap)
+        while len(self.workers) < self.max_workers and len(self.workers) < busy_or_queued + 1:
+            interactive_only = len(self.workers) == 0 and self.max_workers > 1
+            worker = threading.Thread(target=self._worker_loop, args=(interactive_only,),
+                                      name=f"{self.name}-{len(self.workers)}", daemon=True)
+            self.workers.append(worker)
+            worker.start()
+
+    def _next_job(self, interactive_only):
+        with self.cond:
+            while True:
+                if self.stopped:
+                    return None
+                while self.heap and self.heap[0][2].token.cancelled:
+                    _, _, job = heapq.heappop(self.heap)
+                    self._forget(job)
+                    self.stats['dropped'] += 1
+                if self.heap and (not interactive_only or self.heap[0][0] <= PRIORITY_INTERACTIVE):
+                    self.running += 1
+                    return heapq.heappop(self.heap)[2]
+                self.cond.wait()
+
+    def _forget(self, job):
+        if job.key is not None and self.keyed.get(job.key) is job:
+            del self.keyed[job.key]
+
+    def _worker_loop(self, interactive_only):
+        while True:
+            job = self._next_job(interactive_only)
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job):
+        try:
+            with job_context(job.priority, job.token):
+                result = job.fn(*job.args, **job.kwargs)
+        except JobCancelled:
+            result, error = None, None
+            job.token.cancel()
+        except Exception as e:
+            result, error = None, e
+        else:
+            error = None
+
+        with self.cond:
+            self.running -= 1
+            self._forget(job)
+            if job.token.cancelled:
+                self.stats['dropped'] += 1
+                return
+            self.stats['failed' if error else 'completed'] += 1
+
+        try:
+            if error is not None:
+                if job.on_error:
+                    job.on_error(error)
+                else:
+                    print(f"Job error: {error}")
+            elif job.on_result:
+                job.on_result(result)
+        except Exception as e:
+            print(f"Job callback error: {e}")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Returns the process-wide job scheduler.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = JobScheduler()
+    return _scheduler
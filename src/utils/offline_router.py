@@ -0,0 +1,372 @@
+import heapq
+import math
+import sys
+import threading
+import time
+import numpy as np
+from src.utils.geometry import EARTH_RADIUS_M, haversine
+from src.utils.road_graph import RoadGraph
+
+# Farther than this from any road the point is treated as off the graph
+MAX_SNAP_DISTANCE = 2000
+# Alternatives (penalty method): edges of found routes get slower by this
+# factor per round; a candidate is kept if it shares little with the
+# routes so far and is not much slower than the best one.
+ALTERNATIVE_PENALTY = 1.4
+MAX_ALTERNATIVES = 2
+ALTERNATIVE_ROUNDS = 5
+MAX_ALTERNATIVE_OVERLAP = 0.7
+MAX_ALTERNATIVE_STRETCH = 1.4
+
+
+def _distance(lat1, lon1, lat2, lon2):
+    # Scalar haversine without NumPy overhead; called once per visited node
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _path_length(coords):
+    if len(coords) < 2:
+        return 0.0
+    return float(haversine(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1]).sum())
+
+
+class _Snap:
+    """
+    Where a query point meets the graph: at fraction `t` of the segment from
+    shape point `k` of `edge` to the next one, i.e. at position `k + t` along
+    the shape and fraction `f` of the edge's length.
+    """
+
+    def __init__(self, graph, point, t=0.0):
+        self.edge = int(graph.shape_edges[point])
+        self.k = point - int(graph.shape_offsets[self.edge])
+        self.t = t
+        self.shape = graph.edge_shape(self.edge)
+        seg = haversine(self.shape[:-1, 0], self.shape[:-1, 1], self.shape[1:, 0], self.shape[1:, 1])
+        cumulative = np.concatenate(([0.0], np.cumsum(seg)))
+        along = cumulative[self.k] + (t * seg[self.k] if t else 0.0)
+        self.f = along / cumulative[-1] if cumulative[-1] > 0 else 0.0
+        if t:
+            self.lat, self.lon = self.shape[self.k] + t * (self.shape[self.k + 1] - self.shape[self.k])
+        else:
+            self.lat, self.lon = self.shape[self.k]
+
+    @property
+    def position(self):
+        return self.k + self.t
+
+    def ahead(self):
+        # Coordinates from the snapped point to the end of the edge
+        if not self.t:
+            return self.shape[self.k:]
+        return np.vstack(([(self.lat, self.lon)], self.shape[self.k + 1:]))
+
+    def behind(self):
+        # Coordinates from the start of the edge to the snapped point
+        if not self.t:
+            return self.shape[:self.k + 1]
+        return np.vstack((self.shape[:self.k + 1], [(self.lat, self.lon)]))
+
+
+class OfflineRouter:
+    """
+    Shortest (fastest) paths on a local RoadGraph, no routing service needed.
+
+    Queries run bidirectional A* with average potentials (great-circle
+    distance at the graph's top speed), so the two searches meet roughly
+    halfway and only explore an ellipse around the straight line. Results
+    have the same shape as Geocoder.get_route's OSRM routes.
+    """
+
+    def __init__(self, graph=None):
+        self.graph = graph or RoadGraph()
+        g = self.graph
+        # memoryviews index the (memory-mapped) arrays as plain Python numbers
+        self.offsets = memoryview(np.ascontiguousarray(g.offsets))
+        self.targets = memoryview(np.ascontiguousarray(g.targets))
+        self.sources = memoryview(np.ascontiguousarray(g.sources))
+        self.durations = memoryview(np.ascontiguousarray(g.durations))
+        self.rev_offsets = memoryview(np.ascontiguousarray(g.rev_offsets))
+        self.rev_edges = memoryview(np.ascontiguousarray(g.rev_edges))
+        self.node_lat = memoryview(np.ascontiguousarray(g.lat))
+        self.node_lon = memoryview(np.ascontiguousarray(g.lon))
+        self.inv_speed = 1.0 / g.max_speed
+
+    def snap(self, lat, lon):
+        nearest = self.graph.nearest_segment(lat, lon)
+        if nearest is None:
+            return None
+        snap = _Snap(self.graph, *nearest)
+        if _distance(lat, lon, snap.lat, snap.lon) > MAX_SNAP_DISTANCE:
+            return None
+        return snap
+
+    def _source_seeds(self, snap):
+        # node -> (cost, coordinates from the snapped point to the node)
+        g, e = self.graph, snap.edge
+        seeds = {int(g.targets[e]): ((1 - snap.f) * float(g.durations[e]), snap.ahead())}
+        twin = int(g.twins[e])
+        if twin >= 0:
+            cost = snap.f * float(g.durations[e])
+            node = int(g.targets[twin])
+            if node not in seeds or cost < seeds[node][0]:
+                seeds[node] = (cost, snap.behind()[::-1])
+        return seeds
+
+    def _target_seeds(self, snap):
+        # node -> (cost, coordinates from the node to the snapped point)
+        g, e = self.graph, snap.edge
+        seeds = {int(g.sources[e]): (snap.f * float(g.durations[e]), snap.behind())}
+        twin = int(g.twins[e])
+        if twin >= 0:
+            cost = (1 - snap.f) * float(g.durations[e])
+            node = int(g.sources[twin])
+            if node not in seeds or cost < seeds[node][0]:
+                seeds[node] = (cost, snap.ahead()[::-1])
+        return seeds
+
+    def _search(self, source, target, penalties):
+        """
+        Bidirectional A* between two snapped points. Returns
+        (edges, source seed, target seed) or None; a seed is (cost, coordinates).
+        """
+        offsets, targets, durations = self.offsets, self.targets, self.durations
+        rev_offsets, rev_edges, sources = self.rev_offsets, self.rev_edges, self.sources
+        node_lat, node_lon, inv_speed = self.node_lat, self.node_lon, self.inv_speed
+        s_lat, s_lon, t_lat, t_lon = source.lat, source.lon, target.lat, target.lon
+        potentials = {}
+
+        def potential(v):
+            p = potentials.get(v)
+            if p is None:
+                lat, lon = node_lat[v], node_lon[v]
+                p = (_distance(lat, lon, t_lat, t_lon) - _distance(s_lat, s_lon, lat, lon)) * inv_speed / 2
+                potentials[v] = p
+            return p
+
+        src_seeds, dst_seeds = self._source_seeds(source), self._target_seeds(target)
+        dist_f, dist_r, parent_f, parent_r = {}, {}, {}, {}
+        heap_f, heap_r = [], []
+        for v, (cost, _) in src_seeds.items():
+            dist_f[v], parent_f[v] = cost, -1
+            heap_f.append((cost + potential(v), v))
+        for v, (cost, _) in dst_seeds.items():
+            dist_r[v], parent_r[v] = cost, -1
+            heap_r.append((cost - potential(v), v))
+        heapq.heapify(heap_f)
+        heapq.heapify(heap_r)
+
+        best, meet = math.inf, None
+        for v in dist_f:
+            if v in dist_r and dist_f[v] + dist_r[v] < best:
+                best, meet = dist_f[v] + dist_r[v], v
+        stop_slack = _distance(s_lat, s_lon, t_lat, t_lon) * inv_speed / 2
+
+        while heap_f and heap_r:
+            if heap_f[0][0] + heap_r[0][0] >= best + stop_slack:
+                break
+            if len(heap_f) <= len(heap_r):
+                key, v = heapq.heappop(heap_f)
+                d = dist_f[v]
+                if key > d + potential(v) + 1e-9:
+                    continue
+                for e in range(offsets[v], offsets[v + 1]):
+                    w = targets[e]
+                    nd = d + durations[e] * penalties.get(e, 1.0)
+                    if nd < dist_f.get(w, math.inf):
+                        dist_f[w], parent_f[w] = nd, e
+                        heapq.heappush(heap_f, (nd + potential(w), w))
+                        other = dist_r.get(w)
+                        if other is not None and nd + other < best:
+                            best, meet = nd + other, w
+            else:
+                key, v = heapq.heappop(heap_r)
+                d = dist_r[v]
+                if key > d - potential(v) + 1e-9:
+                    continue
+                for i in range(rev_offsets[v], rev_offsets[v + 1]):
+                    e = rev_edges[i]
+                    u = sources[e]
+                    nd = d + durations[e] * penalties.get(e, 1.0)
+                    if nd < dist_r.get(u, math.inf):
+                        dist_r[u], parent_r[u] = nd, e
+                        heapq.heappush(heap_r, (nd - potential(u), u))
+                        other = dist_f.get(u)
+                        if other is not None and nd + other < best:
+                            best, meet = nd + other, u
+
+        if meet is None:
+            return None
+        edges = []
+        v = meet
+        while parent_f[v] >= 0:
+            e = parent_f[v]
+            edges.append(e)
+            v = sources[e]
+        start = v
+        edges.reverse()
+        v = meet
+        while parent_r[v] >= 0:
+            e = parent_r[v]
+            edges.append(e)
+            v = targets[e]
+        return edges, src_seeds[start], dst_seeds[v]
+
+    def _assemble(self, found):
+        g = self.graph
+        edges, (start_cost, start_coords), (end_cost, end_coords) = found
+        coords = np.concatenate([start_coords] + [g.edge_shape(e)[1:] for e in edges] + [end_coords[1:]])
+        edge_idx = np.asarray(edges, dtype=np.int64)
+        return {
+            'edges': edges,
+            'coordinates': coords,
+            'distance': float(g.lengths[edge_idx].sum()) + _path_length(start_coords) + _path_length(end_coords),
+            'duration': float(g.durations[edge_idx].sum()) + start_cost + end_cost
+        }
+
+    @staticmethod
+    def _between(shape, start, end):
+        # Coordinates along `shape` between two (position, point) snaps
+        (a, start_point), (b, end_point) = start, end
+        inner = shape[int(math.floor(a)) + 1:int(math.ceil(b))]
+        return np.vstack(([start_point], inner, [end_point]))
+
+    def _same_edge(self, source, target):
+        # Both points on one road: ahead on the source's edge, or behind it
+        # when the road is two-way (back along the twin). No search needed.
+        g, e = self.graph, source.edge
+        twin = int(g.twins[e])
+        if target.edge == e:
+            position, f = target.position, target.f
+        elif target.edge == twin >= 0:
+            # The twin's shape runs the other way
+            position, f = len(source.shape) - 1 - target.position, 1 - target.f
+        else:
+            return None
+        if position >= source.position:
+            coords = self._between(source.shape, (source.position, (source.lat, source.lon)),
+                                   (position, (target.lat, target.lon)))
+        elif twin >= 0:
+            coords = self._between(source.shape, (position, (target.lat, target.lon)),
+                                   (source.position, (source.lat, source.lon)))[::-1]
+        else:
+            return None
+        return {'edges': [], 'coordinates': coords, 'distance': _path_length(coords),
+                'duration': abs(f - source.f) * float(g.durations[e])}
+
+    def _leg(self, source, target, penalties=None):
+        direct = self._same_edge(source, target) if not penalties else None
+        found = self._search(source, target, penalties or {})
+        if found is None:
+            return direct
+        leg = self._assemble(found)
+        if direct is not None and direct['duration'] <= leg['duration']:
+            return direct
+        return leg
+
+    def _alternatives(self, source, target, best):
+        g = self.graph
+        routes = [best]
+        penalties = {}
+        latest = best
+        for _ in range(ALTERNATIVE_ROUNDS):
+            if len(routes) > MAX_ALTERNATIVES:
+                break
+            for e in latest['edges']:
+                penalties[e] = penalties.get(e, 1.0) * ALTERNATIVE_PENALTY
+                twin = int(g.twins[e])
+                if twin >= 0:
+                    penalties[twin] = penalties.get(twin, 1.0) * ALTERNATIVE_PENALTY
+            latest = self._leg(source, target, penalties)
+            if latest is None or not latest['edges']:
+                break
+            if latest['duration'] > best['duration'] * MAX_ALTERNATIVE_STRETCH:
+                break
+            own = set(latest['edges'])
+            length = float(g.lengths[np.asarray(latest['edges'])].sum()) or 1.0
+            similar = False
+            for route in routes:
+                shared = [e for e in route['edges'] if e in own]
+                if shared and float(g.lengths[np.asarray(shared)].sum()) / length > MAX_ALTERNATIVE_OVERLAP:
+                    similar = True
+                    break
+            if not similar:
+                routes.append(latest)
+        return routes
+
+    def route(self, coordinates, alternatives=True):
+        """
+        Routes through (lat, lon) waypoints. Returns a list of
+        {'coordinates': (N, 2) array, 'distance', 'duration', 'summary'},
+        fastest first (alternatives only for two-point routes), or None if
+        a point is off the graph or unreachable.
+        """
+        snaps = [self.snap(lat, lon) for lat, lon in coordinates]
+        if len(snaps) < 2 or any(snap is None for snap in snaps):
+            return None
+
+        legs = []
+        for source, target in zip(snaps[:-1], snaps[1:]):
+            leg = self._leg(source, target)
+            if leg is None:
+                return None
+            legs.append(leg)
+
+        if len(legs) == 1 and alternatives:
+            found = self._alternatives(snaps[0], snaps[1], legs[0])
+        else:
+            coords = np.concatenate([legs[0]['coordinates']] + [leg['coordinates'][1:] for leg in legs[1:]])
+            found = [{'coordinates': coords,
+                      'distance': sum(leg['distance'] for leg in legs),
+                      'duration': sum(leg['duration'] for leg in legs)}]
+        return [{'coordinates': route['coordinates'], 'distance': route['distance'],
+                 'duration': route['duration'], 'summary': 'Offline'} for route in found]
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_offline_router():
+    """
+    Returns the shared router, or None when no road graph has been built.
+    """
+    global _router
+    if _router is None:
+        if not RoadGraph.exists():
+            return None
+        with _router_lock:
+            if _router is None:
+                _router = OfflineRouter()
+    return _router
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 3 or argv[0] != 'route':
+        print("Usage: python -m src.utils.offline_router route <lat,lon> <lat,lon> [...]")
+        return 1
+    if not RoadGraph.exists():
+        print("No road graph; build one with: python -m src.utils.road_graph build <extract.osm>")
+        return 1
+
+    router = get_offline_router()
+    points = [tuple(float(v) for v in arg.split(',')) for arg in argv[1:]]
+    start = time.perf_counter()
+    routes = router.route(points)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if not routes:
+        print(f"No route ({elapsed_ms:.1f} ms)")
+        return 1
+    for i, route in enumerate(routes):
+        print(f"#{i}: {route['distance'] / 1000:.2f} km, {route['duration'] / 60:.1f} min, "
+              f"{len(route['coordinates'])} points")
+    print(f"({elapsed_ms:.1f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
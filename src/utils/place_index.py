@@ -0,0 +1,247 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from src.utils.resource_path import get_data_path
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# bm25 weights for the (name, display_name) columns; a hit on the short name
+# matters more than one buried in the full address.
+NAME_WEIGHT = 10.0
+DISPLAY_WEIGHT = 1.0
+# How much a place's importance (0..1, as in Nominatim) can lift it in ranking
+IMPORTANCE_WEIGHT = 5.0
+# Ranked full-word matches checked by `find` for one whose name fits the query
+FIND_CANDIDATES = 20
+
+
+def default_index_path():
+    return get_data_path('places.sqlite')
+
+
+def _words(text):
+    # Lowercase words without diacritics, like the FTS tokenizer sees them
+    text = unicodedata.normalize('NFKD', text.lower())
+    return _TOKEN.findall(''.join(ch for ch in text if not unicodedata.combining(ch)))
+
+
+def _fts5_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class PlaceIndex:
+    """
+    Local place index (SQLite FTS5 with prefix indexes) for offline search
+    and autocomplete. Built from a CSV of our own sites or a JSONL export of
+    Nominatim results; see `import_file`.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_index_path()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.fts = _fts5_available(self.conn)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS places (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                display_name TEXT NOT NULL,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                importance REAL NOT NULL DEFAULT 0
+            )
+        """)
+        if self.fts:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS places_fts USING fts5(
+                    name, display_name,
+                    content='places', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3 4'
+                )
+            """)
+        else:
+            self.conn.execute("CREATE INDEX IF NOT EXISTS places_name ON places (name COLLATE NOCASE)")
+        # Lets add_places skip places that are already in the index
+        self.conn.execute("CREATE INDEX IF NOT EXISTS places_identity ON places (display_name, lat, lon)")
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+    def add_places(self, places):
+        """
+        Adds dicts with display_name, lat, lon and optionally name and
+        importance, skipping places already in the index (same display name
+        and coordinates), so re-importing a file adds nothing twice. Returns
+        the number of places added.
+        """
+        rows = []
+        for place in places:
+            display_name = str(place['display_name']).strip()
+            name = str(place.get('name') or display_name.split(',')[0]).strip()
+            rows.append((name, display_name, float(place['lat']), float(place['lon']),
+                         float(place.get('importance') or 0)))
+
+        with self.lock:
+            cursor = self.conn.cursor()
+            added = 0
+            for row in rows:
+                if cursor.execute("SELECT 1 FROM places WHERE display_name = ? AND lat = ? AND lon = ?",
+                                  row[1:4]).fetchone():
+                    continue
+                cursor.execute("INSERT INTO places (name, display_name, lat, lon, importance) "
+                               "VALUES (?, ?, ?, ?, ?)", row)
+                if self.fts:
+                    cursor.execute("INSERT INTO places_fts (rowid, name, display_name) VALUES (?, ?, ?)",
+                                   (cursor.lastrowid, row[0], row[1]))
+                added += 1
+            self.conn.commit()
+        return added
+
+    def import_file(self, path):
+        """
+        Imports a .csv (columns: name or display_name, lat, lon[, importance])
+        or a .jsonl/.json file of Nominatim-style objects.
+        """
+        with open(path, encoding='utf-8') as f:
+            if path.lower().endswith('.csv'):
+                places = [dict(row, display_name=row.get('display_name') or row.get('name'))
+                          for row in csv.DictReader(f)]
+            elif path.lower().endswith('.json'):
+                places = json.load(f)
+            else:
+                places = [json.loads(line) for line in f if line.strip()]
+        count = self.add_places(places)
+        self.optimize()
+        return count
+
+    def optimize(self):
+        with self.lock:
+            if self.fts:
+                self.conn.execute("INSERT INTO places_fts (places_fts) VALUES ('optimize')")
+            self.conn.commit()
+
+    def search(self, query, limit=5):
+        """
+        Ranked places whose words start with every word of the query.
+        Returns [{'lat', 'lon', 'display_name'}, ...].
+        """
+        tokens = _TOKEN.findall(query.lower())
+        if not tokens:
+            return []
+
+        with self.lock:
+            if self.fts:
+                match = " ".join(f'"{token}"*' for token in tokens)
+                rows = self.conn.execute(f"""
+                    SELECT p.lat, p.lon, p.display_name
+                    FROM places_fts JOIN places p ON p.id = places_fts.rowid
+                    WHERE places_fts MATCH ?
+                    ORDER BY bm25(places_fts, {NAME_WEIGHT}, {DISPLAY_WEIGHT}) - {IMPORTANCE_WEIGHT} * p.importance
+                    LIMIT ?
+                """, (match, limit)).fetchall()
+            else:
+                # Without FTS5: prefix match on the name only
+                rows = self.conn.execute("""
+                    SELECT lat, lon, display_name FROM places
+                    WHERE name LIKE ? ESCAPE '\\'
+                    ORDER BY importance DESC LIMIT ?
+                """, (query.strip().replace('%', '\\%').replace('_', '\\_') + '%', limit)).fetchall()
+
+        return [{'lat': lat, 'lon': lon, 'display_name': name} for lat, lon, name in rows]
+
+    def find(self, query, limit=1):
+        """
+        Places that answer the whole query rather than start like it: every
+        query word is a full word of the place, and every word of its name
+        is in the query. "Paris" finds "Paris" but not "Strada Parisului"
+        or "Hotel Lutetia, Rue de Paris". Same result format as search.
+        """
+        words = _words(query)
+        if not words:
+            return []
+
+        with self.lock:
+            if self.fts:
+                match = " ".join(f'"{word}"' for word in words)
+                rows = self.conn.execute(f"""
+                    SELECT p.name, p.lat, p.lon, p.display_name
+                    FROM places_fts JOIN places p ON p.id = places_fts.rowid
+                    WHERE places_fts MATCH ?
+                    ORDER BY bm25(places_fts, {NAME_WEIGHT}, {DISPLAY_WEIGHT}) - {IMPORTANCE_WEIGHT} * p.importance
+                    LIMIT ?
+                """, (match, FIND_CANDIDATES)).fetchall()
+            else:
+                # Without FTS5: the name must be the query
+                rows = self.conn.execute("""
+                    SELECT name, lat, lon, display_name FROM places
+                    WHERE name = ? COLLATE NOCASE
+                    ORDER BY importance DESC LIMIT ?
+                """, (query.strip(), FIND_CANDIDATES)).fetchall()
+
+        wanted = set(words)
+        found = [{'lat': lat, 'lon': lon, 'display_name': display_name}
+                 for name, lat, lon, display_name in rows if set(_words(name)) <= wanted]
+        return found[:limit]
+
+    def suggest(self, query, limit=5):
+        return [place['display_name'] for place in self.search(query, limit)]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_place_index():
+    """
+    Returns the shared local index, or None when no index has been built.
+    """
+    global _index
+    if _index is None:
+        path = default_index_path()
+        if not os.path.exists(path):
+            return None
+        with _index_lock:
+            if _index is None:
+                _index = PlaceIndex(path)
+    return _index
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] not in ('build', 'query'):
+        print("Usage: python -m src.utils.place_index build <places.csv|.jsonl> [...]\n"
+              "       python -m src.utils.place_index query <text>")
+        return 1
+
+    index = PlaceIndex()
+    if argv[0] == 'build':
+        for path in argv[1:]:
+            count = index.import_file(path)
+            print(f"Imported {count} places from {path}")
+        print(f"Index: {index.path} ({len(index)} places, fts5={index.fts})")
+    else:
+        start = time.perf_counter()
+        results = index.search(" ".join(argv[1:]))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for place in results:
+            print(f"{place['lat']:.5f}, {place['lon']:.5f}  {place['display_name']}")
+        print(f"({len(results)} results in {elapsed_ms:.2f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
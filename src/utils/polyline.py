@@ -0,0 +1,53 @@
+import numpy as np
+
+# OSRM's `geometries=polyline6`: Google's encoded polyline format with 6 decimals
+PRECISION = 6
+
+
+def decode(encoded, precision=PRECISION):
+    """
+    Decodes an encoded polyline into an (N, 2) float64 array of [lat, lon].
+    Works on the whole string at once instead of char by char.
+    """
+    if not encoded:
+        return np.empty((0, 2), dtype=np.float64)
+
+    chunks = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    last = (chunks & 0x20) == 0
+    value_id = np.concatenate(([0], np.cumsum(last)[:-1]))
+    value_start = np.concatenate(([0], np.flatnonzero(last)[:-1] + 1))
+    shift = 5 * (np.arange(len(chunks)) - value_start[value_id])
+
+    values = np.add.reduceat((chunks & 0x1f) << shift, value_start)
+    deltas = (values >> 1) ^ -(values & 1)
+    if len(deltas) % 2:
+        raise ValueError("Malformed polyline: odd number of values")
+
+    return np.cumsum(deltas.reshape(-1, 2), axis=0) / float(10 ** precision)
+
+
+def encode(coordinates, precision=PRECISION):
+    """
+    Encodes [lat, lon] pairs (list or array) into a polyline string.
+    """
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if not len(coords):
+        return ""
+
+    scaled = np.round(coords * (10 ** precision)).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = (deltas << 1) ^ (deltas >> 63)
+
+    # Number of 5-bit chunks per value (at least one)
+    counts = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 13):
+        counts += values >= (1 << (5 * k))
+    offsets = np.cumsum(counts) - counts
+
+    out = np.empty(int(counts.sum()), dtype=np.uint8)
+    for k in range(int(counts.max())):
+        sel = counts > k
+        chunk = (values[sel] >> (5 * k)) & 0x1f
+        more = (counts[sel] > k + 1) * 0x20
+        out[offsets[sel] + k] = chunk + more + 63
+    return out.tobytes().decode('ascii')
@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from src.utils.job_scheduler import JobCancelled
+
+# Requests per second and burst size per host. Nominatim's usage policy
+# allows an absolute maximum of one request per second.
+HOST_LIMITS = {
+    'nominatim.openstreetmap.org': (1.0, 1),
+    'ip-api.com': (0.75, 2),
+}
+
+# How often a blocked waiter re-checks whether its job was cancelled
+CANCEL_POLL_INTERVAL = 0.1
+WAIT_SAMPLES = 512
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """
+        Takes a token if one is available and returns 0, otherwise returns
+        the seconds until the next one.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class PriorityRateLimiter:
+    """
+    Token bucket whose waiters are served by priority (lower first), then
+    in arrival order, so interactive lookups overtake queued background work.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.bucket = TokenBucket(rate, burst)
+        self.cond = threading.Condition()
+        self.waiters = []
+        self.counter = itertools.count()
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.granted = 0
+
+    def acquire(self, priority, token=None):
+        """
+        Blocks until this caller may send a request. Raises JobCancelled if
+        `token` is cancelled while waiting.
+        """
+        start = time.monotonic()
+        entry = (priority, next(self.counter))
+        with self.cond:
+            heapq.heappush(self.waiters, entry)
+            try:
+                while True:
+                    if token is not None and token.cancelled:
+                        raise JobCancelled()
+                    if self.waiters[0] == entry:
+                        wait = self.bucket.take()
+                        if wait == 0:
+                            heapq.heappop(self.waiters)
+                            break
+                        self.cond.wait(min(wait, CANCEL_POLL_INTERVAL))
+                    else:
+                        self.cond.wait(CANCEL_POLL_INTERVAL)
+            except BaseException:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+                raise
+            finally:
+                self.cond.notify_all()
+            self.granted += 1
+            self.waits.append(time.monotonic() - start)
+
+    async def acquire_async(self, priority):
+        """
+        acquire for coroutines: waits in the same queue as the threads, but
+        sleeps instead of blocking the event loop. Cancelling the awaiting
+        task takes it out of the queue.
+        """
+        start = time.monotonic()
+        entry = (priority, next(self.counter))
+        with self.cond:
+            heapq.heappush(self.waiters, entry)
+        try:
+            while True:
+                with self.cond:
+                    wait = CANCEL_POLL_INTERVAL
+                    if self.waiters[0] == entry:
+                        wait = self.bucket.take()
+                        if wait == 0:
+                            heapq.heappop(self.waiters)
+                            self.granted += 1
+                            self.waits.append(time.monotonic() - start)
+                            self.cond.notify_all()
+                            return
+                await asyncio.sleep(min(wait, CANCEL_POLL_INTERVAL))
+        except BaseException:
+            with self.cond:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+                self.cond.notify_all()
+            raise
+
+    def stats(self):
+        with self.cond:
+            waits = sorted(self.waits)
+            queued = len(self.waiters)
+            granted = self.granted
+        if not waits:
+            return {'requests': granted, 'queued': queued,
+                    'avg_wait_ms': 0.0, 'p95_wait_ms': 0.0, 'max_wait_ms': 0.0}
+        return {
+            'requests': granted,
+            'queued': queued,
+            'avg_wait_ms': 1000 * sum(waits) / len(waits),
+            'p95_wait_ms': 1000 * waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+            'max_wait_ms': 1000 * waits[-1]
+        }
+
+
+class RateLimiterRegistry:
+    """
+    One PriorityRateLimiter per host listed in `limits`; other hosts are unlimited.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(HOST_LIMITS if limits is None else limits)
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def get(self, host):
+        if host not in self.limits:
+            return None
+        with self.lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                rate, burst = self.limits[host]
+                limiter = self.limiters[host] = PriorityRateLimiter(rate, burst)
+            return limiter
+
+    def set_limit(self, host, rate, burst=1):
+        with self.lock:
+            self.limits[host] = (rate, burst)
+            self.limiters.pop(host, None)
+
+    def stats(self):
+        with self.lock:
+            limiters = dict(self.limiters)
+        return {host: limiter.stats() for host, limiter in limiters.items()}
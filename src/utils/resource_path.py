@@ -12,3 +12,10 @@ def get_resource_path(relative_path):
         base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
     return os.path.join(base_path, relative_path)
+
+def get_data_path(relative_path):
+    """ Get absolute path inside the per-user data folder (caches, indexes) """
+    base_path = os.environ.get('CHEAPMAPS_DATA_DIR') or os.path.join(os.path.expanduser('~'), '.cheapmaps')
+    path = os.path.join(base_path, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
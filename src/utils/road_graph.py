@@ -0,0 +1,341 @@
+import bz2
+import gzip
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
+from src.utils.geometry import haversine
+from src.utils.resource_path import get_data_path
+
+# Default car speeds (km/h) per highway class, used when a way has no maxspeed
+HIGHWAY_SPEEDS = {
+    'motorway': 110, 'motorway_link': 60,
+    'trunk': 90, 'trunk_link': 50,
+    'primary': 70, 'primary_link': 40,
+    'secondary': 60, 'secondary_link': 40,
+    'tertiary': 50, 'tertiary_link': 30,
+    'unclassified': 40, 'residential': 30,
+    'living_street': 10, 'service': 15, 'road': 30,
+}
+NO_ACCESS = {'no', 'private', 'agricultural', 'forestry', 'delivery'}
+
+# Snapping grid over shape points (degrees per cell)
+GRID_DEGREES = 0.01
+_GRID_COLS = int(round(360 / GRID_DEGREES)) + 1
+
+ARRAYS = ('lat', 'lon', 'offsets', 'targets', 'sources', 'durations', 'lengths', 'twins',
+          'rev_offsets', 'rev_edges', 'shape_offsets', 'shape_lat', 'shape_lon',
+          'shape_edges', 'grid_cells', 'grid_points')
+
+
+def default_graph_dir():
+    return get_data_path('roadgraph')
+
+
+def grid_cell(lat, lon):
+    row = np.floor((np.asarray(lat, dtype=float) + 90) / GRID_DEGREES).astype(np.int64)
+    col = np.floor((np.asarray(lon, dtype=float) + 180) / GRID_DEGREES).astype(np.int64)
+    return row * _GRID_COLS + col
+
+
+def _parse_speed(value, default):
+    if not value:
+        return default
+    value = value.strip().lower()
+    try:
+        if value.endswith('mph'):
+            return float(value[:-3].strip()) * 1.609
+        return float(value.split()[0])
+    except ValueError:
+        return default
+
+
+def _oneway(tags):
+    value = tags.get('oneway', '').lower()
+    if value == '-1':
+        return -1
+    if value in ('yes', '1', 'true'):
+        return 1
+    if value == 'no':
+        return 0
+    if tags.get('junction') in ('roundabout', 'circular') or tags.get('highway') == 'motorway':
+        return 1
+    return 0
+
+
+def _open_osm(path):
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _iter_elements(path, tag):
+    """
+    Streams the <tag> elements of an OSM XML file, freeing everything
+    already parsed so memory stays flat on large extracts.
+    """
+    with _open_osm(path) as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event != 'end' or elem.tag not in ('node', 'way', 'relation'):
+                continue
+            if elem.tag == tag:
+                yield elem
+            root.clear()
+
+
+def _read_ways(path):
+    ways = []
+    for elem in _iter_elements(path, 'way'):
+        tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+        highway = tags.get('highway')
+        if (highway in HIGHWAY_SPEEDS
+                and tags.get('access') not in NO_ACCESS
+                and tags.get('motor_vehicle') not in NO_ACCESS
+                and tags.get('area') != 'yes'):
+            refs = [int(nd.get('ref')) for nd in elem.iter('nd')]
+            if len(refs) > 1:
+                speed = _parse_speed(tags.get('maxspeed'), HIGHWAY_SPEEDS[highway])
+                ways.append((np.array(refs, dtype=np.int64), _oneway(tags), speed))
+    return ways
+
+
+def _read_nodes(path, ids):
+    lat = np.full(len(ids), np.nan)
+    lon = np.full(len(ids), np.nan)
+    for elem in _iter_elements(path, 'node'):
+        node_id = int(elem.get('id'))
+        i = np.searchsorted(ids, node_id)
+        if i < len(ids) and ids[i] == node_id:
+            lat[i] = float(elem.get('lat'))
+            lon[i] = float(elem.get('lon'))
+    return lat, lon
+
+
+def build_graph(osm_path, out_dir=None, log=print):
+    """
+    Imports an OSM XML extract (.osm, .osm.bz2 or .osm.gz) of drivable roads
+    into a compact CSR graph under `out_dir`.
+
+    Chains of degree-2 nodes are collapsed into single edges whose geometry
+    is kept in the shape arrays, so the search only visits junctions.
+    Everything is saved as .npy files that RoadGraph memory-maps.
+    """
+    out_dir = out_dir or default_graph_dir()
+    start = time.perf_counter()
+    ways = _read_ways(osm_path)
+    if not ways:
+        raise ValueError(f"No drivable ways in {osm_path}")
+    all_refs = np.concatenate([refs for refs, _, _ in ways])
+    ids, uses = np.unique(all_refs, return_counts=True)
+    log(f"{len(ways)} ways, {len(ids)} nodes ({time.perf_counter() - start:.1f}s)")
+
+    node_lat, node_lon = _read_nodes(osm_path, ids)
+    # Same precision as stored, so lengths and heuristics agree exactly
+    node_lat = node_lat.astype(np.float32).astype(float)
+    node_lon = node_lon.astype(np.float32).astype(float)
+
+    # Junctions: shared nodes and way ends
+    is_junction = uses > 1
+    for refs, _, _ in ways:
+        is_junction[np.searchsorted(ids, refs[[0, -1]])] = True
+    graph_id = np.full(len(ids), -1, dtype=np.int64)
+    graph_id[is_junction] = np.arange(int(is_junction.sum()))
+
+    src, dst, durations, lengths, twins, shapes = [], [], [], [], [], []
+    for refs, oneway, speed in ways:
+        idx = np.searchsorted(ids, refs)
+        if np.isnan(node_lat[idx]).any():
+            continue  # way crosses the extract boundary
+        seg_len = haversine(node_lat[idx[:-1]], node_lon[idx[:-1]], node_lat[idx[1:]], node_lon[idx[1:]])
+        cuts = np.flatnonzero(is_junction[idx])
+        for a, b in zip(cuts[:-1], cuts[1:]):
+            shape = idx[a:b + 1]
+            length = float(seg_len[a:b].sum())
+            duration = length / (speed / 3.6)
+            u, v = int(graph_id[shape[0]]), int(graph_id[shape[-1]])
+            if u == v and length == 0:
+                continue
+            forward = backward = None
+            if oneway >= 0:
+                forward = len(src)
+                src.append(u); dst.append(v); durations.append(duration); lengths.append(length)
+                shapes.append(shape); twins.append(-1)
+            if oneway <= 0:
+                backward = len(src)
+                src.append(v); dst.append(u); durations.append(duration); lengths.append(length)
+                shapes.append(shape[::-1]); twins.append(-1)
+            if forward is not None and backward is not None:
+                twins[forward], twins[backward] = backward, forward
+
+    n = int(is_junction.sum())
+    src = np.array(src, dtype=np.int64)
+    dst = np.array(dst, dtype=np.int64)
+    order = np.argsort(src, kind='stable')
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    twins = np.array(twins, dtype=np.int64)[order]
+    twins = np.where(twins >= 0, position[np.maximum(twins, 0)], -1)
+
+    shape_counts = np.array([len(shapes[e]) for e in order], dtype=np.int64)
+    shape_idx = np.concatenate([shapes[e] for e in order])
+    shape_offsets = np.concatenate(([0], np.cumsum(shape_counts)))
+    shape_lat = node_lat[shape_idx].astype(np.float32)
+    shape_lon = node_lon[shape_idx].astype(np.float32)
+    shape_edges = np.repeat(np.arange(len(order), dtype=np.int32), shape_counts)
+    cells = grid_cell(shape_lat, shape_lon)
+    grid_points = np.argsort(cells, kind='stable').astype(np.int64)
+
+    sorted_dst = dst[order]
+    rev_edges = np.argsort(sorted_dst, kind='stable').astype(np.int64)
+    arrays = {
+        'lat': node_lat[is_junction].astype(np.float32),
+        'lon': node_lon[is_junction].astype(np.float32),
+        'offsets': np.concatenate(([0], np.cumsum(np.bincount(src, minlength=n)))).astype(np.int64),
+        'targets': sorted_dst.astype(np.int32),
+        'sources': src[order].astype(np.int32),
+        'durations': np.array(durations, dtype=np.float32)[order],
+        'lengths': np.array(lengths, dtype=np.float32)[order],
+        'twins': twins.astype(np.int64),
+        'rev_offsets': np.concatenate(([0], np.cumsum(np.bincount(sorted_dst, minlength=n)))).astype(np.int64),
+        'rev_edges': rev_edges,
+        'shape_offsets': shape_offsets,
+        'shape_lat': shape_lat,
+        'shape_lon': shape_lon,
+        'shape_edges': shape_edges,
+        'grid_cells': cells[grid_points],
+        'grid_points': grid_points,
+    }
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(out_dir, f"{name}.npy"), arrays[name])
+    speeds = np.array(lengths) / np.maximum(np.array(durations), 1e-9)
+    meta = {
+        'source': os.path.basename(osm_path),
+        'nodes': n,
+        'edges': len(order),
+        'shape_points': int(len(shape_idx)),
+        'max_speed_mps': float(speeds.max()) if len(speeds) else 1.0,
+        'bbox': [float(np.nanmin(shape_lat)), float(np.nanmin(shape_lon)),
+                 float(np.nanmax(shape_lat)), float(np.nanmax(shape_lon))],
+        'built': time.time(),
+    }
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    log(f"Graph: {n} junctions, {len(order)} edges, {len(shape_idx)} shape points "
+        f"in {out_dir} ({time.perf_counter() - start:.1f}s)")
+    return out_dir
+
+
+class RoadGraph:
+    """
+    Read-only CSR road graph loaded from the .npy files written by
+    build_graph. Arrays are memory-mapped, so opening a country-sized graph
+    is instant and only the pages a search touches are read.
+    """
+
+    def __init__(self, directory=None, mmap=True):
+        self.directory = directory or default_graph_dir()
+        with open(os.path.join(self.directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(self.directory, f"{name}.npy"),
+                                        mmap_mode='r' if mmap else None))
+        self.max_speed = self.meta['max_speed_mps']
+
+    @staticmethod
+    def exists(directory=None):
+        return os.path.exists(os.path.join(directory or default_graph_dir(), 'meta.json'))
+
+    def edge_shape(self, edge):
+        start, end = self.shape_offsets[edge], self.shape_offsets[edge + 1]
+        return np.column_stack((self.shape_lat[start:end], self.shape_lon[start:end])).astype(float)
+
+    def _nearby_points(self, lat, lon, max_rings):
+        # Shape points in the grid rings around (lat, lon), up to one ring
+        # past the first that has any (a nearer point can be in ring r + 1)
+        center = int(grid_cell(lat, lon))
+        found, found_ring = [], None
+        for ring in range(max_rings + 1):
+            for dr in range(-ring, ring + 1):
+                for dc in range(-ring, ring + 1):
+                    if max(abs(dr), abs(dc)) != ring:
+                        continue
+                    cell = center + dr * _GRID_COLS + dc
+                    lo = np.searchsorted(self.grid_cells, cell, side='left')
+                    hi = np.searchsorted(self.grid_cells, cell, side='right')
+                    if hi > lo:
+                        found.append(self.grid_points[lo:hi])
+                        found_ring = ring if found_ring is None else found_ring
+            if found_ring is not None and ring > found_ring:
+                break
+        return np.concatenate(found) if found else None
+
+    def nearest_point(self, lat, lon, max_rings=5):
+        """
+        Index of the shape point nearest to (lat, lon), searching grid rings
+        up to `max_rings` cells away (about 1 km each). Returns None if the
+        point is off the graph.
+        """
+        points = self._nearby_points(lat, lon, max_rings)
+        if points is None:
+            return None
+        dist = haversine(lat, lon, self.shape_lat[points], self.shape_lon[points])
+        return int(points[int(np.argmin(dist))])
+
+    def nearest_segment(self, lat, lon, max_rings=5):
+        """
+        Nearest position on a road to (lat, lon): (shape point index, t) for
+        the point at fraction t of the way from that shape point to the next
+        one of its edge. Candidates are the segments on either side of the
+        shape points nearest_point would consider, so a long segment wins
+        over a nearer-looking vertex of another road. Returns None if the
+        point is off the graph.
+        """
+        points = self._nearby_points(lat, lon, max_rings)
+        if points is None:
+            return None
+        edges = self.shape_edges
+        last = len(edges) - 1
+        after = points[points < last]
+        after = after[edges[after + 1] == edges[after]]
+        before = points[points > 0] - 1
+        before = before[edges[before] == edges[before + 1]]
+        starts = np.unique(np.concatenate((after, before)))
+        if not len(starts):
+            # Only single-point shapes nearby; cannot happen for built graphs
+            return self.nearest_point(lat, lon, max_rings), 0.0
+
+        # Project in a local equirectangular frame around the query point
+        scale = np.cos(np.radians(lat))
+        a_lat = self.shape_lat[starts].astype(float)
+        a_lon = self.shape_lon[starts].astype(float)
+        d_lat = self.shape_lat[starts + 1] - a_lat
+        d_lon = self.shape_lon[starts + 1] - a_lon
+        dx, dy = d_lon * scale, d_lat
+        length2 = dx * dx + dy * dy
+        along = (lon - a_lon) * scale * dx + (lat - a_lat) * dy
+        t = np.clip(np.divide(along, length2, out=np.zeros_like(along), where=length2 > 0), 0.0, 1.0)
+        dist = haversine(lat, lon, a_lat + t * d_lat, a_lon + t * d_lon)
+        i = int(np.argmin(dist))
+        if t[i] >= 1.0:
+            return int(starts[i]) + 1, 0.0
+        return int(starts[i]), float(t[i])
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] != 'build':
+        print("Usage: python -m src.utils.road_graph build <extract.osm[.bz2|.gz]> [output_dir]")
+        return 1
+    build_graph(argv[1], argv[2] if len(argv) > 2 else None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+from src.utils import polyline
+from src.utils.geo_cache import GeoCache
+from src.utils.resource_path import get_data_path
+
+# 4 decimals is ~11 m: stops nudged by a few metres via map pick share an entry
+ROUTE_PRECISION = 4
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_DISK_TTL = 7 * 24 * 3600
+DEFAULT_DISK_ENTRIES = 5000
+
+
+def route_key(profile, coordinates, options=None, precision=ROUTE_PRECISION):
+    """
+    Cache key from the routing profile, the ordered rounded waypoints and
+    the request options (sorted, so dict order does not matter).
+    """
+    coords = ";".join(f"{lat:.{precision}f},{lon:.{precision}f}" for lat, lon in coordinates)
+    opts = "&".join(f"{k}={v}" for k, v in sorted((options or {}).items()))
+    return f"{profile}|{coords}|{opts}"
+
+
+def _serialize(routes):
+    # Geometry is stored as polyline6, which is what OSRM returned in the first place
+    return [dict(route, coordinates=polyline.encode(route['coordinates'])) for route in routes]
+
+
+def _deserialize(routes):
+    return [dict(route, coordinates=polyline.decode(route['coordinates'])) for route in routes]
+
+
+class RouteCache:
+    """
+    In-memory LRU of parsed routes, optionally backed by a SQLite GeoCache
+    so corridors planned yesterday are still warm after a restart.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, persist=True, path=None,
+                 disk_ttl=DEFAULT_DISK_TTL, disk_entries=DEFAULT_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk = None
+        if persist:
+            # The LRU above already holds decoded routes; no second in-memory copy
+            self.disk = GeoCache(path=path or get_data_path('routecache.sqlite'),
+                                 ttl=disk_ttl, max_entries=disk_entries, memory_entries=0)
+
+    def get(self, key):
+        """
+        Returns a fresh list of the cached routes (callers may reorder it) or None.
+        """
+        with self.lock:
+            routes = self.memory.get(key)
+            if routes is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return list(routes)
+
+        routes = None
+        if self.disk is not None:
+            stored = self.disk.get('route', key)
+            if stored is not None:
+                routes = _deserialize(stored)
+
+        with self.lock:
+            if routes is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, routes)
+            return list(routes)
+
+    def set(self, key, routes):
+        with self.lock:
+            self._remember(key, list(routes))
+        if self.disk is not None:
+            self.disk.set('route', key, _serialize(routes))
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self.memory)
+            }
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.hits = self.misses = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def _remember(self, key, routes):
+        self.memory[key] = routes
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_route_cache():
+    """
+    Returns the process-wide route cache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RouteCache()
+    return _cache
@@ -0,0 +1,63 @@
+import numpy as np
+from src.utils.geometry import haversine, to_array
+from src.utils.route_cache import route_key
+
+# Vertices this close (metres) to a waypoint count as passing through it
+SNAP_TOLERANCE_M = 1.0
+
+
+def leg_key(profile, start, end):
+    """
+    Route cache key of the single leg start -> end.
+    """
+    return route_key(profile, [start, end], {'leg': 1})
+
+
+def cumulative_length(coords):
+    if len(coords) < 2:
+        return np.zeros(len(coords))
+    seg = haversine(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+    return np.concatenate(([0.0], np.cumsum(seg)))
+
+
+def split_route(coords, waypoints, leg_distances):
+    """
+    Cuts a multi-waypoint route geometry into one piece per leg.
+
+    `waypoints` are the snapped (lat, lon) locations the route passes
+    through (OSRM's response waypoints) and `leg_distances` the length of
+    each leg. The geometry can pass a waypoint more than once (loops, out
+    and back), so among the vertices on a waypoint the one closest to the
+    expected distance along the route is taken. Returns a list of (N, 2)
+    arrays that share their joint vertices.
+    """
+    coords = to_array(coords)
+    waypoints = to_array(waypoints)
+    along = cumulative_length(coords)
+    # Geometry length and OSRM's leg distances differ slightly; compare in proportion
+    expected = np.cumsum(leg_distances)[:-1]
+    scale = along[-1] / max(float(np.sum(leg_distances)), 1e-9)
+
+    cuts = [0]
+    for (lat, lon), target in zip(waypoints[1:-1], expected * scale):
+        start = cuts[-1]
+        dist = haversine(lat, lon, coords[start:, 0], coords[start:, 1])
+        near = np.flatnonzero(dist <= dist.min() + SNAP_TOLERANCE_M)
+        best = near[np.argmin(np.abs(along[start + near] - target))]
+        cuts.append(start + int(best))
+    cuts.append(len(coords) - 1)
+    return [coords[a:b + 1] for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def stitch_legs(legs, summary='Route'):
+    """
+    Joins consecutive legs ({'coordinates', 'distance', 'duration'}) into
+    one route, dropping the duplicated vertex at every joint.
+    """
+    parts = [legs[0]['coordinates']] + [leg['coordinates'][1:] for leg in legs[1:]]
+    return {
+        'coordinates': np.concatenate(parts),
+        'distance': sum(leg['distance'] for leg in legs),
+        'duration': sum(leg['duration'] for leg in legs),
+        'summary': summary
+    }
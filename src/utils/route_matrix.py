@@ -0,0 +1,149 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+from src.utils.backends import get_service
+from src.utils.geo_cache import GeoCache
+from src.utils.job_scheduler import current_priority, current_token, job_context
+from src.utils.resource_path import get_data_path
+from src.utils.route_cache import ROUTE_PRECISION
+
+# osrm-routed's default --max-table-size: sources + destinations per request
+MAX_TABLE_COORDINATES = 100
+MATRIX_CONCURRENCY = 4
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 20000
+
+
+def table_blocks(n_sources, n_destinations, max_coordinates=MAX_TABLE_COORDINATES):
+    """
+    Splits an n_sources x n_destinations matrix into (source range,
+    destination range) blocks of at most `max_coordinates` points each.
+    Block sizes are fixed and boundaries depend only on the index, so
+    appending stops leaves the earlier blocks (and their cache entries)
+    unchanged.
+    """
+    src_step = max(1, max_coordinates // 2)
+    dst_step = max(1, max_coordinates - src_step)
+    return [(range(i, min(i + src_step, n_sources)), range(j, min(j + dst_step, n_destinations)))
+            for i in range(0, n_sources, src_step)
+            for j in range(0, n_destinations, dst_step)]
+
+
+def _block_key(profile, sources, destinations):
+    fmt = lambda points: ";".join(f"{lat:.{ROUTE_PRECISION}f},{lon:.{ROUTE_PRECISION}f}"
+                                  for lat, lon in points)
+    return f"{profile}|{fmt(sources)}|{fmt(destinations)}"
+
+
+def _to_matrix(rows, shape):
+    # OSRM uses null for unreachable pairs
+    return np.array([[np.nan if v is None else v for v in row] for row in rows],
+                    dtype=float).reshape(shape)
+
+
+class RouteMatrix:
+    """
+    Many-to-many duration/distance matrices from OSRM's `table` service.
+
+    Large matrices are fetched as concurrent blocks that fit the server's
+    table size limit; each block is cached on disk by its rounded
+    coordinates, so repeated dispatch runs only ask for the pairs they
+    have not seen yet.
+    """
+
+    def __init__(self, service=None, profile='driving',
+                 max_coordinates=MAX_TABLE_COORDINATES, concurrency=MATRIX_CONCURRENCY,
+                 cache=None, persist=True):
+        self.service = service or get_service('osrm')
+        self.profile = profile
+        self.max_coordinates = max_coordinates
+        self.concurrency = concurrency
+        self.cache = cache if cache is not None or not persist else get_matrix_cache()
+        self.stats = {'blocks': 0, 'cached_blocks': 0}
+        self.stats_lock = threading.Lock()
+
+    def table(self, sources, destinations=None):
+        """
+        Returns {'durations': (N, M) seconds, 'distances': (N, M) metres} as
+        float arrays, NaN where no route exists. `destinations` defaults to
+        `sources`. Raises requests.RequestException if a block fails.
+        """
+        sources = [tuple(p) for p in sources]
+        destinations = sources if destinations is None else [tuple(p) for p in destinations]
+        durations = np.full((len(sources), len(destinations)), np.nan)
+        distances = np.full_like(durations, np.nan)
+        if not sources or not destinations:
+            return {'durations': durations, 'distances': distances}
+
+        blocks = table_blocks(len(sources), len(destinations), self.max_coordinates)
+        priority, token = current_priority(), current_token()
+
+        def fetch(block):
+            rows, cols = block
+            with job_context(priority, token):
+                return block, self._fetch_block([sources[i] for i in rows],
+                                                [destinations[j] for j in cols])
+
+        if len(blocks) == 1:
+            results = [fetch(blocks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(blocks))) as executor:
+                results = list(executor.map(fetch, blocks))
+
+        for (rows, cols), (block_durations, block_distances) in results:
+            durations[rows.start:rows.stop, cols.start:cols.stop] = block_durations
+            distances[rows.start:rows.stop, cols.start:cols.stop] = block_distances
+        return {'durations': durations, 'distances': distances}
+
+    def _fetch_block(self, sources, destinations):
+        shape = (len(sources), len(destinations))
+        key = _block_key(self.profile, sources, destinations)
+        with self.stats_lock:
+            self.stats['blocks'] += 1
+        if self.cache is not None:
+            cached = self.cache.get('table', key)
+            if cached is not None:
+                with self.stats_lock:
+                    self.stats['cached_blocks'] += 1
+                return _to_matrix(cached['durations'], shape), _to_matrix(cached['distances'], shape)
+
+        points = sources + destinations
+        coords_str = ";".join(f"{lon},{lat}" for lat, lon in points)
+        params = {
+            'sources': ";".join(str(i) for i in range(len(sources))),
+            'destinations': ";".join(str(len(sources) + j) for j in range(len(destinations))),
+            'annotations': 'duration,distance'
+        }
+        response = self.service.get(f"/table/v1/{self.profile}/{coords_str}", params=params)
+        response.raise_for_status()
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise requests.RequestException(f"Invalid table response: {e}")
+        if data.get('code') != 'Ok':
+            raise requests.RequestException(f"Table error: {data.get('code')} {data.get('message', '')}")
+
+        block = {'durations': data['durations'], 'distances': data.get('distances')}
+        if block['distances'] is None:
+            block['distances'] = [[None] * shape[1] for _ in range(shape[0])]
+        if self.cache is not None:
+            self.cache.set('table', key, block)
+        return _to_matrix(block['durations'], shape), _to_matrix(block['distances'], shape)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_matrix_cache():
+    """
+    Returns the process-wide block cache for table results.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GeoCache(path=get_data_path('matrixcache.sqlite'), ttl=DEFAULT_TTL,
+                                  max_entries=DEFAULT_MAX_ENTRIES, memory_entries=256)
+    return _cache
@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import threading
+import time
+from src.utils.resource_path import get_data_path
+
+MB = 1024 * 1024
+
+# Upstream tile sources for the map layers offered in the Layers menu.
+# 'prefetch': False marks servers whose usage policy rules out bulk
+# downloading even when the user opts in (OpenTopoMap is volunteer run).
+TILE_LAYERS = {
+    'dark': {
+        'url': 'https://{s}.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}{r}.png',
+        'subdomains': 'abcd',
+        'budget': 512 * MB
+    },
+    'light': {
+        'url': 'https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png',
+        'subdomains': 'abcd',
+        'budget': 512 * MB
+    },
+    'satellite': {
+        'url': 'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        'subdomains': '',
+        'budget': 1024 * MB
+    },
+    'terrain': {
+        'url': 'https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png',
+        'subdomains': 'abc',
+        'budget': 512 * MB,
+        'prefetch': False
+    }
+}
+
+# Access times are written at most this often per tile
+TOUCH_INTERVAL = 3600
+
+
+def guess_content_type(data):
+    """
+    Image type of tile bytes from their signature, for tiles stored
+    without one; PNG unless they look like JPEG or WebP.
+    """
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/png'
+
+
+class MBTilesStore:
+    """
+    One layer's tiles in an MBTiles file (tiles table, TMS row order).
+    A side table tracks size, content type and last access so the layer can
+    be kept under its byte budget by evicting the least recently used tiles.
+    """
+
+    def __init__(self, path, name, budget):
+        self.path = path
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS tiles (
+                zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row);
+            CREATE TABLE IF NOT EXISTS tile_usage (
+                zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                size INTEGER, accessed REAL, content_type TEXT,
+                PRIMARY KEY (zoom_level, tile_column, tile_row)
+            );
+            CREATE INDEX IF NOT EXISTS tile_usage_accessed ON tile_usage (accessed);
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tile_usage)")]
+        if 'content_type' not in columns:
+            self.conn.execute("ALTER TABLE tile_usage ADD COLUMN content_type TEXT")
+        self.conn.executemany("INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+                              [('name', name), ('format', 'png'), ('type', 'baselayer')])
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM tile_usage").fetchone()[0]
+
+    @staticmethod
+    def _tms(z, x, y):
+        # MBTiles stores rows bottom-up; Leaflet/XYZ counts top-down
+        return z, x, (1 << z) - 1 - y
+
+    def get(self, z, x, y):
+        """
+        (tile bytes, content type), or None if the tile is not stored.
+        """
+        key = self._tms(z, x, y)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT t.tile_data, u.accessed, u.content_type FROM tiles t LEFT JOIN tile_usage u "
+                "ON u.zoom_level = t.zoom_level AND u.tile_column = t.tile_column AND u.tile_row = t.tile_row "
+                "WHERE t.zoom_level = ? AND t.tile_column = ? AND t.tile_row = ?", key).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row[1] is None or now - row[1] > TOUCH_INTERVAL:
+                self.conn.execute("UPDATE tile_usage SET accessed = ? "
+                                  "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", (now,) + key)
+                self.conn.commit()
+            data = bytes(row[0])
+            return data, row[2] or guess_content_type(data)
+
+    def contains(self, z, x, y):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                self._tms(z, x, y)).fetchone() is not None
+
+    def put(self, z, x, y, data, content_type=None):
+        key = self._tms(z, x, y)
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM tile_usage "
+                                    "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", key).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) "
+                              "VALUES (?, ?, ?, ?)", key + (sqlite3.Binary(data),))
+            self.conn.execute("INSERT OR REPLACE INTO tile_usage "
+                              "(zoom_level, tile_column, tile_row, size, accessed, content_type) "
+                              "VALUES (?, ?, ?, ?, ?, ?)",
+                              key + (len(data), time.time(), content_type or guess_content_type(data)))
+            self.size += len(data) - (old[0] if old else 0)
+            if self.size > self.budget:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Trim to 90% of the budget so eviction does not run on every insert
+        target = self.size - int(self.budget * 0.9)
+        victims = []
+        freed = 0
+        for z, x, y, size in self.conn.execute(
+                "SELECT zoom_level, tile_column, tile_row, size FROM tile_usage ORDER BY accessed ASC"):
+            victims.append((z, x, y))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany("DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", victims)
+        self.conn.executemany("DELETE FROM tile_usage WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", victims)
+        self.size -= freed
+
+
+class TileCache:
+    """
+    MBTiles stores for all layers, opened on first use.
+    Retina tiles ('@2x') are kept in their own file per layer.
+    """
+
+    def __init__(self, directory=None, layers=None):
+        self.directory = directory or get_data_path(os.path.join('tiles', ''))
+        os.makedirs(self.directory, exist_ok=True)
+        self.layers = layers or TILE_LAYERS
+        self.stores = {}
+        self.lock = threading.Lock()
+
+    def store(self, layer, retina=False):
+        # Layers without a {r} placeholder serve the same tile either way
+        retina = retina and '{r}' in self.layers[layer]['url']
+        name = layer + ('@2x' if retina else '')
+        with self.lock:
+            store = self.stores.get(name)
+            if store is None:
+                path = os.path.join(self.directory, f"{name}.mbtiles")
+                store = MBTilesStore(path, name, self.layers[layer]['budget'])
+                self.stores[name] = store
+            return store
+
+    def get(self, layer, z, x, y, retina=False):
+        return self.store(layer, retina).get(z, x, y)
+
+    def put(self, layer, z, x, y, data, retina=False, content_type=None):
+        self.store(layer, retina).put(z, x, y, data, content_type)
+
+    def contains(self, layer, z, x, y, retina=False):
+        return self.store(layer, retina).contains(z, x, y)
+
+    def upstream_url(self, layer, z, x, y, retina=False):
+        config = self.layers[layer]
+        subdomains = config.get('subdomains') or ''
+        s = subdomains[(x + y) % len(subdomains)] if subdomains else ''
+        return config['url'].format(s=s, z=z, x=x, y=y, r='@2x' if retina else '')
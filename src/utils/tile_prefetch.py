@@ -0,0 +1,145 @@
+import os
+import numpy as np
+from src.utils.geometry import to_array, project_mercator
+from src.utils.job_scheduler import get_scheduler, PRIORITY_BACKGROUND, JobCancelled
+from src.utils.tile_cache import TILE_LAYERS
+
+PREFETCH_MIN_ZOOM = 5
+PREFETCH_MAX_ZOOM = 15
+BUFFER_TILES = 1            # extra ring of tiles on each side of the route
+MAX_PREFETCH_TILES = 250    # per route; coarse zooms are kept first when capping
+PREFETCH_PARALLELISM = 2    # background jobs; the tile fetcher caps total downloads
+
+# Prefetching is off unless enabled per layer, e.g. for a self-hosted or
+# licensed tile server: CHEAPMAPS_PREFETCH_LAYERS=dark,satellite
+PREFETCH_LAYERS_ENV = 'CHEAPMAPS_PREFETCH_LAYERS'
+
+
+def prefetch_layers(layers=None):
+    """
+    Layers the user opted in to prefetching for, minus those whose tile
+    server does not allow it.
+    """
+    layers = layers or TILE_LAYERS
+    wanted = {name.strip() for name in os.environ.get(PREFETCH_LAYERS_ENV, '').split(',')}
+    return {name for name in wanted if name in layers and layers[name].get('prefetch', True)}
+
+
+def corridor_tiles(coordinates, min_zoom=PREFETCH_MIN_ZOOM, max_zoom=PREFETCH_MAX_ZOOM,
+                   buffer_tiles=BUFFER_TILES):
+    """
+    Returns [(z, x, y), ...] covering the route plus a buffer of whole tiles,
+    coarse zooms first and, within a zoom, in order along the route.
+    """
+    coords = to_array(coordinates)
+    if not len(coords):
+        return []
+    projected = project_mercator(coords)
+    offsets = np.arange(-buffer_tiles, buffer_tiles + 1)
+    ring = np.array(np.meshgrid(offsets, offsets)).reshape(2, -1).T
+
+    tiles = []
+    for z in range(min_zoom, max_zoom + 1):
+        n = 1 << z
+        pts = projected * n
+
+        # Densify so consecutive samples are under half a tile apart
+        if len(pts) > 1:
+            seg = np.diff(pts, axis=0)
+            steps = np.maximum(1, np.ceil(np.hypot(seg[:, 0], seg[:, 1]) * 2)).astype(np.int64)
+            seg_id = np.repeat(np.arange(len(seg)), steps)
+            frac = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / steps[seg_id]
+            samples = np.vstack((pts[seg_id] + seg[seg_id] * frac[:, None], pts[-1:]))
+        else:
+            samples = pts
+
+        cells = np.floor(samples).astype(np.int64)
+        # Drop runs of samples in the same tile before growing the buffer
+        changed = np.concatenate(([True], np.any(cells[1:] != cells[:-1], axis=1)))
+        cells = cells[changed]
+        cells = (cells[:, None, :] + ring[None, :, :]).reshape(-1, 2)
+        cells[:, 0] %= n                                  # wrap around the antimeridian
+        cells = cells[(cells[:, 1] >= 0) & (cells[:, 1] < n)]
+
+        # Unique, but keep first-seen (along-route) order
+        _, first = np.unique(cells[:, 0] * n + cells[:, 1], return_index=True)
+        for x, y in cells[np.sort(first)].tolist():
+            tiles.append((z, x, y))
+    return tiles
+
+
+class TilePrefetcher:
+    """
+    Warms the tile cache along a route at background priority, for the
+    layers in `layers` (prefetch_layers() by default) only. A new route
+    supersedes the previous prefetch; a corridor that is already cached is
+    left alone, so switching between routes does not start over.
+    """
+
+    def __init__(self, fetcher, scheduler=None, min_zoom=PREFETCH_MIN_ZOOM,
+                 max_zoom=PREFETCH_MAX_ZOOM, buffer_tiles=BUFFER_TILES,
+                 max_tiles=MAX_PREFETCH_TILES, layers=None):
+        self.fetcher = fetcher
+        self.scheduler = scheduler or get_scheduler()
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.buffer_tiles = buffer_tiles
+        self.max_tiles = max_tiles
+        self.layers = prefetch_layers() if layers is None else set(layers)
+        self.cached = set()
+        self.current = None
+
+    @staticmethod
+    def _corridor_key(coordinates, layer, retina):
+        coords = to_array(coordinates)
+        ends = tuple(map(tuple, coords[[0, -1]].round(6).tolist())) if len(coords) else ()
+        return layer, bool(retina), len(coords), ends
+
+    def prefetch(self, coordinates, layer, retina=False):
+        """
+        Plans the corridor and starts warming it, all off the calling thread.
+        Does nothing for a layer that is not enabled, or for a corridor that
+        is already cached or being warmed.
+        """
+        if layer not in self.layers:
+            return
+        key = self._corridor_key(coordinates, layer, retina)
+        if key in self.cached or key == self.current:
+            return
+        self.cancel()
+        self.current = key
+        self.scheduler.submit(self._plan, coordinates, layer, retina, key,
+                              priority=PRIORITY_BACKGROUND, key="tile-prefetch:plan",
+                              pass_token=True)
+
+    def cancel(self):
+        self.current = None
+        self.scheduler.cancel("tile-prefetch:plan")
+        for i in range(PREFETCH_PARALLELISM):
+            self.scheduler.cancel(f"tile-prefetch:{i}")
+
+    def _plan(self, coordinates, layer, retina, key, token):
+        tiles = corridor_tiles(coordinates, self.min_zoom, self.max_zoom, self.buffer_tiles)
+        cache = self.fetcher.cache
+        tiles = [t for t in tiles[:self.max_tiles] if not cache.contains(layer, *t, retina)]
+        if token.cancelled:
+            raise JobCancelled()
+        if not tiles:
+            self.cached.add(key)
+            return 0
+        for i in range(PREFETCH_PARALLELISM):
+            self.scheduler.submit(self._warm, tiles[i::PREFETCH_PARALLELISM], layer, retina,
+                                  priority=PRIORITY_BACKGROUND, key=f"tile-prefetch:{i}",
+                                  pass_token=True)
+        return len(tiles)
+
+    def _warm(self, tiles, layer, retina, token):
+        fetched = 0
+        for z, x, y in tiles:
+            if token.cancelled:
+                raise JobCancelled()
+            if self.fetcher.cache.contains(layer, z, x, y, retina):
+                continue
+            if self.fetcher.get_tile(layer, z, x, y, retina) is not None:
+                fetched += 1
+        return fetched
@@ -0,0 +1,146 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from src.utils import http_client
+from src.utils.tile_cache import TileCache, guess_content_type
+
+# Upstream tile downloads in flight at once, across all layers
+FETCH_CONCURRENCY = 6
+
+_TILE_PATH = re.compile(r"^/tiles/(\w+)/(\d+)/(\d+)/(\d+)(@2x)?\.png$")
+
+
+class TileFetcher:
+    """
+    Cache-first tile access: hits come from the MBTiles store, misses are
+    downloaded with bounded concurrency and stored. Concurrent requests for
+    the same missing tile share one download.
+    """
+
+    def __init__(self, cache=None, concurrency=FETCH_CONCURRENCY):
+        self.cache = cache or TileCache()
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+    def get_tile(self, layer, z, x, y, retina=False):
+        """
+        Returns (tile bytes, content type), or None if the tile is not cached
+        and cannot be fetched.
+        """
+        tile = self.cache.get(layer, z, x, y, retina)
+        if tile is not None:
+            return tile
+
+        key = (layer, z, x, y, retina)
+        with self.lock:
+            waiter = self.inflight.get(key)
+            owner = waiter is None
+            if owner:
+                waiter = self.inflight[key] = {'event': threading.Event(), 'data': None}
+
+        if not owner:
+            waiter['event'].wait()
+            return waiter['data']
+
+        try:
+            waiter['data'] = self._download(layer, z, x, y, retina)
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            waiter['event'].set()
+        return waiter['data']
+
+    def _download(self, layer, z, x, y, retina):
+        url = self.cache.upstream_url(layer, z, x, y, retina)
+        with self.semaphore:
+            try:
+                response = http_client.get(url, headers={'Accept': 'image/*'})
+                response.raise_for_status()
+            except requests.RequestException as e:
+                print(f"Tile error: {e}")
+                return None
+        data = response.content
+        # Not every layer is PNG: the satellite imagery comes as JPEG
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        if not content_type.startswith('image/'):
+            content_type = guess_content_type(data)
+        self.cache.put(layer, z, x, y, data, retina, content_type)
+        return data, content_type
+
+
+class _TileRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        match = _TILE_PATH.match(self.path.split('?', 1)[0])
+        if not match or match.group(1) not in self.server.fetcher.cache.layers:
+            self._send(404, b"")
+            return
+
+        layer, z, x, y, retina = match.groups()
+        tile = self.server.fetcher.get_tile(layer, int(z), int(x), int(y), bool(retina))
+        if tile is None:
+            self._send(404, b"")
+        else:
+            self._send(200, *tile)
+
+    def _send(self, status, body, content_type="text/plain"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            self.send_header("Cache-Control", "max-age=86400")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TileServer:
+    """
+    Local HTTP endpoint (127.0.0.1, random port) that Leaflet loads tiles from:
+    http://127.0.0.1:<port>/tiles/<layer>/<z>/<x>/<y>[@2x].png
+    """
+
+    def __init__(self, fetcher=None, host="127.0.0.1", port=0):
+        self.fetcher = fetcher or TileFetcher()
+        self.httpd = ThreadingHTTPServer((host, port), _TileRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fetcher = self.fetcher
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                           name="cheapmaps-tiles", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread = None
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_tile_server():
+    """
+    Returns the process-wide tile server, started on first use.
+    """
+    global _server
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                _server = TileServer().start()
+    return _server
@@ -0,0 +1,139 @@
+import numpy as np
+
+# Stand-in cost for pairs OSRM could not route (NaN in the matrix)
+UNREACHABLE_COST = 1e9
+MAX_PASSES = 1000
+OR_OPT_SEGMENTS = (1, 2, 3)
+
+
+def path_cost(costs, order):
+    """
+    Total cost of visiting `order` (indices into the square `costs` matrix).
+    """
+    order = np.asarray(order)
+    return float(costs[order[:-1], order[1:]].sum())
+
+
+def _prepare(durations, fixed_end):
+    costs = np.array(durations, dtype=float)
+    costs[~np.isfinite(costs)] = UNREACHABLE_COST
+    np.fill_diagonal(costs, 0.0)
+    if fixed_end:
+        return costs, len(costs) - 1
+    # An open path is a path to a dummy end that is free to reach from anywhere
+    n = len(costs)
+    padded = np.zeros((n + 1, n + 1))
+    padded[:n, :n] = costs
+    padded[n, :n] = UNREACHABLE_COST
+    return padded, n
+
+
+def nearest_neighbour(costs, start, end):
+    """
+    Greedy path from `start` through every node, finishing at `end`.
+    """
+    n = len(costs)
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[[start, end]] = False
+    order = [start]
+    for _ in range(n - 2):
+        row = np.where(unvisited, costs[order[-1]], np.inf)
+        nxt = int(np.argmin(row))
+        unvisited[nxt] = False
+        order.append(nxt)
+    order.append(end)
+    return order
+
+
+def two_opt(costs, order):
+    """
+    Best-improvement 2-opt on a path with fixed endpoints. Segment reversal
+    is costed in both directions, so asymmetric matrices (one-way streets)
+    are handled. Each pass evaluates every (i, j) pair at once.
+    """
+    order = np.asarray(order)
+    n = len(order)
+    if n < 4:
+        return order.tolist()
+    idx = np.arange(n)
+    for _ in range(MAX_PASSES):
+        forward = np.concatenate(([0.0], np.cumsum(costs[order[:-1], order[1:]])))
+        backward = np.concatenate(([0.0], np.cumsum(costs[order[1:], order[:-1]])))
+        # Reverse order[i..j] for 1 <= i < j <= n - 2
+        i = idx[1:-1, None]
+        j = idx[None, 1:-1]
+        a, b, c, d = order[i - 1], order[i], order[j], order[np.minimum(j + 1, n - 1)]
+        old = costs[a, b] + (forward[j] - forward[i]) + costs[c, d]
+        new = costs[a, c] + (backward[j] - backward[i]) + costs[b, d]
+        delta = np.where(j > i, new - old, 0.0)
+        best = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[best] > -1e-9:
+            break
+        bi, bj = best[0] + 1, best[1] + 1
+        order[bi:bj + 1] = order[bi:bj + 1][::-1].copy()
+    return order.tolist()
+
+
+def or_opt(costs, order):
+    """
+    Moves runs of 1-3 consecutive stops to the cheapest other position on
+    the path, keeping their direction. Endpoints stay put.
+    """
+    order = list(order)
+    improved = True
+    passes = 0
+    while improved and passes < MAX_PASSES:
+        improved = False
+        passes += 1
+        for length in OR_OPT_SEGMENTS:
+            i = 1
+            while i + length < len(order):
+                segment = order[i:i + length]
+                prev, nxt = order[i - 1], order[i + length]
+                removal_gain = (costs[prev, segment[0]] + costs[segment[-1], nxt]
+                                - costs[prev, nxt])
+                rest = np.array(order[:i] + order[i + length:])
+                u, v = rest[:-1], rest[1:]
+                insert_cost = costs[u, segment[0]] + costs[segment[-1], v] - costs[u, v]
+                pos = int(np.argmin(insert_cost))
+                if insert_cost[pos] < removal_gain - 1e-9:
+                    rest = rest.tolist()
+                    order = rest[:pos + 1] + segment + rest[pos + 1:]
+                    improved = True
+                else:
+                    i += 1
+    return order
+
+
+def optimize_order(durations, fixed_end=True):
+    """
+    Visiting order for the stops of a duration matrix, starting at stop 0
+    and, with fixed_end, finishing at the last stop. Nearest neighbour
+    seeds a path that 2-opt and Or-opt improve until neither finds a gain.
+
+    Returns (order, typed_cost, optimized_cost) where the costs are the path
+    durations of the given order and of the optimized one.
+    """
+    n = len(durations)
+    typed = list(range(n))
+    if n < 3 or (fixed_end and n < 4):
+        costs = np.nan_to_num(np.asarray(durations, dtype=float), nan=UNREACHABLE_COST)
+        cost = path_cost(costs, typed) if n > 1 else 0.0
+        return typed, cost, cost
+
+    costs, end = _prepare(durations, fixed_end)
+    order = nearest_neighbour(costs, 0, end)
+    while True:
+        cost = path_cost(costs, order)
+        order = or_opt(costs, two_opt(costs, order))
+        if path_cost(costs, order) >= cost - 1e-9:
+            break
+    if not fixed_end:
+        order = order[:-1]
+    typed_cost = path_cost(costs, typed)
+
+    # Never hand back something worse than what the user typed
+    optimized_cost = path_cost(costs, order)
+    if optimized_cost > typed_cost:
+        return typed, typed_cost, typed_cost
+    return order, typed_cost, optimized_cost
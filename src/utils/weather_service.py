@@ -1,60 +1,154 @@
+import math
+import threading
+import time
+from collections import OrderedDict
 import requests
+from src.utils.backends import get_service
+
+# Points within the same ~5 km cell share one weather answer
+GRID_DEGREES = 0.05
+
+# Open-Meteo refreshes its models hourly; cached data expires shortly after
+# the next refresh rather than after a fixed age.
+MODEL_UPDATE_INTERVAL = 3600
+MODEL_PUBLISH_DELAY = 300
+
+DAILY_FIELDS = "weathercode,temperature_2m_max,temperature_2m_min,precipitation_probability_max"
+
+# Bundles kept in memory; least recently used cells are dropped beyond this
+MAX_CACHED_CELLS = 2048
+
+# cell -> {'data', 'expires'}, least recently used first
+_cache = OrderedDict()
+_inflight = {}
+_cache_lock = threading.Lock()
+
+
+def grid_cell(lat, lon):
+    return (int(math.floor(lat / GRID_DEGREES)), int(math.floor(lon / GRID_DEGREES)))
+
+
+def cell_center(cell):
+    return ((cell[0] + 0.5) * GRID_DEGREES, (cell[1] + 0.5) * GRID_DEGREES)
+
+
+def next_model_update(now=None):
+    now = time.time() if now is None else now
+    boundary = (math.floor(now / MODEL_UPDATE_INTERVAL) + 1) * MODEL_UPDATE_INTERVAL
+    return boundary + MODEL_PUBLISH_DELAY
+
+
+def parse_bundle(data):
+    return {
+        'current_weather': data.get('current_weather'),
+        'daily': data.get('daily')
+    }
+
 
 class WeatherService:
     def __init__(self):
-        self.base_url = "https://api.open-meteo.com/v1/forecast"
+        self.open_meteo = get_service('open_meteo')
 
-    def get_current_weather(self, lat, lon):
+    def get_weather_bundle(self, lat, lon):
         """
-        Fetches current weather for the given coordinates.
-        Returns a dictionary with temp, weather code, and description.
+        Current conditions and the 7-day forecast for the grid cell around
+        (lat, lon), fetched with a single request and cached until the next
+        model update. Concurrent calls for the same cell share one request.
+        Returns {'current_weather': ..., 'daily': ...} or None.
+        """
+        cell = grid_cell(lat, lon)
+        with _cache_lock:
+            entry = _cache.get(cell)
+            if entry and entry['expires'] > time.time():
+                _cache.move_to_end(cell)
+                return entry['data']
+            waiter = _inflight.get(cell)
+            owner = waiter is None
+            if owner:
+                waiter = _inflight[cell] = {'event': threading.Event(), 'data': None}
+
+        if not owner:
+            waiter['event'].wait()
+            return waiter['data']
+
+        try:
+            waiter['data'] = self._store_bundle(cell, self._fetch_bundle(cell))
+        finally:
+            with _cache_lock:
+                del _inflight[cell]
+            waiter['event'].set()
+        return waiter['data']
+
+    def peek_bundle(self, lat, lon):
+        """
+        Cached bundle for (lat, lon) or None, without any network access.
         """
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "current_weather": "true"
+        with _cache_lock:
+            cell = grid_cell(lat, lon)
+            entry = _cache.get(cell)
+            if entry and entry['expires'] > time.time():
+                _cache.move_to_end(cell)
+                return entry['data']
+        return None
+
+    def _store_bundle(self, cell, data):
+        if data is not None:
+            now = time.time()
+            with _cache_lock:
+                _cache[cell] = {'data': data, 'expires': next_model_update(now)}
+                _cache.move_to_end(cell)
+                # Drop expired entries from the least recently used end, and any over the cap
+                while _cache:
+                    oldest = next(iter(_cache.values()))
+                    if oldest['expires'] > now and len(_cache) <= MAX_CACHED_CELLS:
+                        break
+                    _cache.popitem(last=False)
+        return data
+
+    def _bundle_params(self, cell):
+        lat, lon = cell_center(cell)
+        return {
+            "latitude": round(lat, 4),
+            "longitude": round(lon, 4),
+            "current_weather": "true",
+            "daily": DAILY_FIELDS,
+            "timezone": "auto"
         }
-        
+
+    def _fetch_bundle(self, cell):
         try:
-            response = requests.get(self.base_url, params=params, timeout=5)
+            response = self.open_meteo.get('/v1/forecast', params=self._bundle_params(cell), timeout=5)
             response.raise_for_status()
-            data = response.json()
-            
-            if "current_weather" in data:
-                cw = data["current_weather"]
-                return {
-                    "temperature": cw["temperature"],
-                    "weathercode": cw["weathercode"],
-                    "description": self._get_weather_description(cw["weathercode"])
-                }
-            return None
-            
-        except requests.RequestException as e:
+            return parse_bundle(response.json())
+        except (requests.RequestException, ValueError) as e:
             print(f"Weather API error: {e}")
             return None
 
+    def get_current_weather(self, lat, lon):
+        """
+        Fetches current weather for the given coordinates.
+        Returns a dictionary with temp, weather code, and description.
+        """
+        bundle = self.get_weather_bundle(lat, lon)
+        if bundle and bundle.get('current_weather'):
+            return self._parse_current(bundle['current_weather'])
+        return None
+
     def get_forecast(self, lat, lon):
         """
         Fetches 7-day forecast.
         """
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "daily": "weathercode,temperature_2m_max,temperature_2m_min,precipitation_probability_max",
-            "timezone": "auto"
+        bundle = self.get_weather_bundle(lat, lon)
+        if bundle:
+            return bundle.get('daily')
+        return None
+
+    def _parse_current(self, cw):
+        return {
+            "temperature": cw["temperature"],
+            "weathercode": cw["weathercode"],
+            "description": self._get_weather_description(cw["weathercode"])
         }
-        
-        try:
-            response = requests.get(self.base_url, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "daily" in data:
-                return data["daily"]
-            return None
-        except Exception as e:
-            print(f"Forecast error: {e}")
-            return None
 
     def _get_weather_description(self, code):
         """
@@ -0,0 +1,43 @@
+import csv
+import requests
+from src.utils.batch_geocode import BatchGeocoder
+
+
+class _FlakyGeocoder:
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.queries = []
+
+    def lookup(self, query):
+        self.queries.append(query)
+        if query in self.failing:
+            raise requests.ConnectionError('offline')
+        return {'lat': 44.0, 'lon': 26.0, 'display_name': query}, 'remote'
+
+
+def _read(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [(row['address'], row['status']) for row in csv.DictReader(f)]
+
+
+def test_resume_retries_failed_rows(tmp_path):
+    source = tmp_path / 'in.csv'
+    source.write_text('address\n' + ''.join(f'street {i}\n' for i in range(6)))
+    output = str(tmp_path / 'out.csv')
+
+    report = BatchGeocoder(_FlakyGeocoder({'street 2'}), workers=2, checkpoint_every=1).run(str(source), output)
+    assert report['statuses'] == {'ok': 5, 'error': 1}
+    assert report['retry_from'] == 2
+    assert _read(output)[2] == ('street 2', 'error')
+
+    geocoder = _FlakyGeocoder(())
+    report = BatchGeocoder(geocoder, workers=2, checkpoint_every=1).run(str(source), output)
+    assert report['resumed_from'] == 2
+    assert report['retry_from'] is None
+    assert sorted(geocoder.queries) == [f'street {i}' for i in range(2, 6)]
+    assert _read(output) == [(f'street {i}', 'ok') for i in range(6)]
+
+    # Finished cleanly: nothing left to redo
+    geocoder = _FlakyGeocoder(())
+    BatchGeocoder(geocoder, workers=2).run(str(source), output)
+    assert geocoder.queries == []
@@ -0,0 +1,22 @@
+import threading
+from src.utils.job_scheduler import JobScheduler, PRIORITY_BACKGROUND
+
+
+def test_second_background_job_gets_its_own_worker():
+    scheduler = JobScheduler(max_workers=4)
+    release = threading.Event()
+    started = [threading.Event(), threading.Event()]
+
+    def job(i):
+        started[i].set()
+        release.wait(5)
+
+    try:
+        scheduler.submit(job, 0, priority=PRIORITY_BACKGROUND)
+        assert started[0].wait(2)
+        scheduler.submit(job, 1, priority=PRIORITY_BACKGROUND)
+        # Runs alongside the first instead of queueing behind it
+        assert started[1].wait(2)
+    finally:
+        release.set()
+        scheduler.shutdown(wait=True)
@@ -0,0 +1,65 @@
+import pytest
+from src.utils.offline_router import OfflineRouter
+from src.utils.road_graph import RoadGraph, build_graph
+
+
+def _write_osm(path, ways):
+    # ways: [(points [(lat, lon)], extra tags)]; every way gets its own nodes
+    nodes, elements, node_id = [], [], 0
+    for way_id, (points, tags) in enumerate(ways, 1):
+        refs = []
+        for lat, lon in points:
+            node_id += 1
+            nodes.append(f'<node id="{node_id}" lat="{lat}" lon="{lon}"/>')
+            refs.append(f'<nd ref="{node_id}"/>')
+        tags = ''.join(f'<tag k="{k}" v="{v}"/>' for k, v in dict(tags, highway='residential').items())
+        elements.append(f'<way id="{way_id}">{"".join(refs)}{tags}</way>')
+    path.write_text(f'<osm>{"".join(nodes)}{"".join(elements)}</osm>')
+    return str(path)
+
+
+def _router(tmp_path, ways):
+    osm = _write_osm(tmp_path / 'roads.osm', ways)
+    return OfflineRouter(RoadGraph(build_graph(osm, str(tmp_path / 'graph'), log=lambda *args: None)))
+
+
+def _straight_way(count, oneway=False):
+    # Along lat 45, a vertex every 0.001° lon (~79 m)
+    return [(45.0, round(26.0 + i * 0.001, 3)) for i in range(count)], {'oneway': 'yes'} if oneway else {}
+
+
+@pytest.mark.parametrize('start, end', [(26.001, 26.003), (26.003, 26.001)])
+def test_route_along_one_edge_both_directions(tmp_path, start, end):
+    route = _router(tmp_path, [_straight_way(6)]).route([(45.0, start), (45.0, end)], alternatives=False)[0]
+
+    lons = route['coordinates'][:, 1]
+    assert lons[0] == pytest.approx(start)
+    assert lons[-1] == pytest.approx(end)
+    # Straight from one point to the other, never past either end
+    assert lons.min() == pytest.approx(min(start, end))
+    assert lons.max() == pytest.approx(max(start, end))
+    assert route['distance'] == pytest.approx(157, abs=2)
+
+
+def test_route_backwards_on_oneway_is_not_direct(tmp_path):
+    router = _router(tmp_path, [_straight_way(6, oneway=True)])
+
+    assert router.route([(45.0, 26.001), (45.0, 26.003)], alternatives=False) is not None
+    assert router.route([(45.0, 26.003), (45.0, 26.001)], alternatives=False) is None
+
+
+def test_snap_projects_onto_long_segments(tmp_path):
+    # A 2 km road with no vertices in between, and a densely noded road
+    # about 330 m away whose nearest vertex is closer than either end
+    long_road = [(45.0, 26.0), (45.0, 26.025)], {}
+    dense_road = [(45.003, 26.0 + i * 0.0005) for i in range(60)], {}
+    router = _router(tmp_path, [long_road, dense_road])
+
+    snap = router.snap(45.0002, 26.0125)
+    assert (snap.lat, snap.lon) == pytest.approx((45.0, 26.0125), abs=1e-6)
+    assert snap.f == pytest.approx(0.5, abs=1e-3)
+
+    route = router.route([(45.0002, 26.005), (45.0002, 26.015)], alternatives=False)[0]
+    assert route['coordinates'][0] == pytest.approx((45.0, 26.005), abs=1e-6)
+    assert route['coordinates'][-1] == pytest.approx((45.0, 26.015), abs=1e-6)
+    assert route['distance'] == pytest.approx(786, abs=5)
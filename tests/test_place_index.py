@@ -0,0 +1,41 @@
+import pytest
+from src.utils.place_index import PlaceIndex
+
+PLACES = """name,display_name,lat,lon,importance
+Strada Parisului,"Strada Parisului, Bucuresti",44.4,26.1,0.2
+Paris,"Paris, Île-de-France, France",48.85,2.35,0.9
+Hotel Lutetia,"Hotel Lutetia, Rue de Paris, Bucuresti",44.41,26.11,0.1
+Depozit Nord,"Depozit Nord, Șoseaua Chitilei, București",44.5,26.0,0
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / 'places.csv'
+    path.write_text(PLACES, encoding='utf-8')
+    index = PlaceIndex(str(tmp_path / 'places.sqlite'))
+    index.import_file(str(path))
+    return index
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('Paris', 'Paris, Île-de-France, France'),
+    ('paris, france', 'Paris, Île-de-France, France'),
+    ('Depozit Nord, Bucuresti', 'Depozit Nord, Șoseaua Chitilei, București'),
+    ('Pari', None),
+    ('Parisului', None),
+    ('Rue de Paris', None),
+    ('Nord', None),
+])
+def test_find_needs_the_whole_query(index, query, expected):
+    found = index.find(query)
+    assert (found[0]['display_name'] if found else None) == expected
+
+
+def test_suggest_matches_prefixes(index):
+    assert {'Paris, Île-de-France, France', 'Strada Parisului, Bucuresti'} <= set(index.suggest('Pari'))
+
+
+def test_import_again_adds_nothing(index, tmp_path):
+    assert index.import_file(str(tmp_path / 'places.csv')) == 0
+    assert len(index) == 4
@@ -0,0 +1,72 @@
+import base64
+import hashlib
+import os
+import sys
+import urllib.request
+
+# Leaflet is loaded from src/vendor/leaflet so the map starts without a CDN round trip
+# and works offline. Run this once after bumping the version, then commit the files.
+LEAFLET_VERSION = "1.9.4"
+LEAFLET_CDN = f"https://unpkg.com/leaflet@{LEAFLET_VERSION}/dist"
+
+# SRI hashes published for the release (same as the CDN fallback in map_app.html);
+# the images are pinned to the files shipped in the release's dist/images
+ASSETS = {
+    "leaflet.js": "sha256-20nQCchB9co0qIjJZRGuk2/Z9VM+kNiyxNV1lvTlZBo=",
+    "leaflet.css": "sha256-p4NxAoJBhIIN+hmNHrzRCf9tD/miZyoHS5obTRR9BMY=",
+    "images/layers.png": "sha256-Hbvp0CjikvNvy6j4s6KNXokydU/CIVuaxp5M3s9RB8Y=",
+    "images/layers-2x.png": "sha256-Bm2sqFDY/77wB68AsG6sABVyje4nnFHzy2xxbffELt8=",
+    "images/marker-icon.png": "sha256-V0w6XMqF9BFAhbaEFZbWLwDXyJLHsD8oy/owHesdxDc=",
+    "images/marker-icon-2x.png": "sha256-ABecTB7oMNOhCEEq4NKU9Vd2z+sIXGASmjmqb8SuJSg=",
+    "images/marker-shadow.png": "sha256-Jk9cZAM58ELdcpBiz8BMF/jqDymIK1OOOEjtjxDttNo=",
+}
+
+TARGET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "vendor", "leaflet")
+
+
+def verify(name, data, integrity):
+    if integrity is None:
+        return
+    algo, expected = integrity.split("-", 1)
+    actual = base64.b64encode(hashlib.new(algo, data).digest()).decode("ascii")
+    if actual != expected:
+        raise ValueError(f"{name}: integrity mismatch ({actual} != {expected})")
+
+
+def missing_assets():
+    """
+    Names of the assets that are not in TARGET_DIR or fail their integrity check.
+    """
+    missing = []
+    for name, integrity in ASSETS.items():
+        path = os.path.join(TARGET_DIR, name)
+        try:
+            with open(path, "rb") as f:
+                verify(name, f.read(), integrity)
+        except (OSError, ValueError):
+            missing.append(name)
+    return missing
+
+
+def main():
+    print(f"Vendoring Leaflet {LEAFLET_VERSION} into {TARGET_DIR}")
+    for name, integrity in ASSETS.items():
+        url = f"{LEAFLET_CDN}/{name}"
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        verify(name, data, integrity)
+
+        path = os.path.join(TARGET_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        print(f"  {name} ({len(data)} bytes)")
+    print("Done.")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"Vendoring failed: {e}")
+        sys.exit(1)